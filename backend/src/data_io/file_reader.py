@@ -4,7 +4,59 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.
 
 import json
 import pandas as pd
-from typing import Union
+from typing import List, Union
+
+
+class XlsxSession:
+    """
+    A single open handle on an .xlsx workbook.
+
+    The workbook is opened once by openpyxl in read-only (streaming) mode and
+    every sheet parse reuses that handle, so pulling several sheets does not
+    re-open and re-decompress the zip/XML for each one. Only the sheets that are
+    actually read are parsed into DataFrames.
+
+    Typical usage:
+      with FileReader.open_xlsx(path) as book:
+          docs = book.read_sheet("Documentation", header=None, dtype=str)
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path: Path to the Excel file.
+        """
+        self.path = path
+        self._book = pd.ExcelFile(path, engine="openpyxl")
+
+    @property
+    def sheet_names(self) -> List[str]:
+        """Names of all sheets in the workbook."""
+        return list(self._book.sheet_names)
+
+    def read_sheet(self, sheet_name: Union[str, int] = 0, **kwargs) -> pd.DataFrame:
+        """
+        Parse one sheet into a pandas DataFrame using the shared handle.
+
+        Args:
+            sheet_name: Sheet name or index; defaults to the first sheet.
+            **kwargs: Passed through to pandas.ExcelFile.parse (e.g., header, dtype).
+
+        Returns:
+            pandas.DataFrame
+        """
+        return self._book.parse(sheet_name=sheet_name, **kwargs)
+
+    def close(self) -> None:
+        """Release the underlying workbook handle."""
+        self._book.close()
+
+    def __enter__(self) -> "XlsxSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
 
 class FileReader:
     """
@@ -55,6 +107,19 @@ class FileReader:
             pandas.DataFrame
         """
         return pd.read_excel(path, sheet_name=sheet_name, engine="openpyxl", **kwargs)
+
+    @staticmethod
+    def open_xlsx(path: str) -> XlsxSession:
+        """
+        Open an Excel (.xlsx) workbook once for reading several sheets.
+
+        Args:
+            path: Path to the Excel file.
+
+        Returns:
+            XlsxSession (usable as a context manager).
+        """
+        return XlsxSession(path)
     
     @staticmethod
     def read_json(path: str) -> Union[dict, list]:
@@ -68,4 +133,30 @@ class FileReader:
             Parsed JSON content as a dict or list.
         """
         with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
\ No newline at end of file
+            return json.load(f)
+
+    @staticmethod
+    def read_jsonl(path: str) -> List[dict]:
+        """
+        Read a JSONL file (one JSON object per line).
+
+        Blank lines and a truncated/malformed line (e.g. from an interrupted
+        append) are skipped rather than failing the whole read.
+
+        Args:
+            path: Path to the JSONL file.
+
+        Returns:
+            List of parsed records in file order.
+        """
+        records: List[dict] = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
@@ -23,6 +23,20 @@ class FileWriter:
             else:
                 json.dump(data, f, ensure_ascii=ensure_ascii)
 
+    @staticmethod
+    def append_jsonl(record: Any, path: str, ensure_ascii: bool = False) -> None:
+        """
+        Append one JSON-serializable record as a single line to a JSONL file.
+
+        Args:
+            record: Object to serialize (typically a dict).
+            path: Output file path (created if missing).
+            ensure_ascii: Escape non-ASCII characters if True.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8", newline="\n") as f:
+            f.write(json.dumps(record, ensure_ascii=ensure_ascii) + "\n")
+
     @staticmethod
     def write_text(content: str, path: str, encoding: str = "utf-8") -> None:
         """
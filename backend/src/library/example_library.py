@@ -0,0 +1,232 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import re
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.src.data_io.file_reader import FileReader
+from backend.src.data_io.file_writer import FileWriter
+from backend.src.rule_compiler.rule_index import RuleIndex
+from backend.src.llm.token_estimator import TokenEstimator
+
+
+_SECTION_RE = re.compile(r"^#[ \t]+(.+?)[ \t]*$", re.MULTILINE)
+_CODE_RE = re.compile(r"```[ \t]*[A-Za-z]*[^\n]*\n(.*?)```", re.DOTALL)
+
+
+class ExampleLibrary:
+    """
+    Few-shot example source over the curated module library (ps-code-library-au).
+
+    Each <name>.md holds "# Submitter / # Email / # Version / # Technical Description /
+    # Business Description / # Code" sections. The library:
+      - parses every .md into a record (persisted as JSON next to the other outputs),
+        re-parsing only files whose mtime/size/content changed since the last refresh,
+      - keeps a BM25 similarity index (RuleIndex) over the module names and the
+        technical / business descriptions,
+      - selects the one or two modules most similar to a user query that fit a
+        token cap and renders them for the <<EXAMPLES_PLAYBOOK>> slot.
+
+    Typical usage:
+      library = ExampleLibrary.shared()
+      examples = library.select(user_query, top_k=2, token_budget=6000)
+      text = ExampleLibrary.render(examples)
+    """
+
+    INDEX_VERSION = "1"
+    SECTIONS = {
+        "submitter": "submitter",
+        "email": "email",
+        "version": "version",
+        "technical description": "technical_description",
+        "business description": "business_description",
+        "code": "code",
+    }
+
+    _memo: Dict[Tuple[str, str], "ExampleLibrary"] = {}
+    _memo_lock = threading.Lock()
+
+    def __init__(
+        self,
+        library_dir: str = "backend/src/data/ps-code-library-au",
+        index_path: Optional[str] = "backend/src/outputs/library/examples_index.json",
+        refresh_interval: float = 30.0,
+    ) -> None:
+        """
+        Args:
+            library_dir: Directory holding the <name>.md modules.
+            index_path: JSON file persisting the parsed records; None keeps them in-process only.
+            refresh_interval: Minimum seconds between two scans of library_dir during select().
+        """
+        self.library_dir = library_dir
+        self.index_path = index_path
+        self.refresh_interval = float(refresh_interval)
+        self.records: List[Dict[str, Any]] = []
+        self._files: Dict[str, Dict[str, Any]] = self._load_index()
+        self._index: Optional[RuleIndex] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    @classmethod
+    def shared(cls, library_dir: str = "backend/src/data/ps-code-library-au", **kwargs: Any) -> "ExampleLibrary":
+        """Process-wide instance per library directory / index file."""
+        key = (os.path.abspath(library_dir), str(kwargs.get("index_path", "")))
+        with cls._memo_lock:
+            if key not in cls._memo:
+                cls._memo[key] = cls(library_dir, **kwargs)
+            return cls._memo[key]
+
+    # -------------------- Public APIs --------------------
+    def refresh(self) -> bool:
+        """
+        Re-scan library_dir and re-parse added/changed modules (deleted ones are dropped).
+
+        Returns:
+            True if anything changed (the similarity index is then rebuilt).
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            names = sorted(n for n in os.listdir(self.library_dir) if n.lower().endswith(".md"))
+            files: Dict[str, Dict[str, Any]] = {}
+            changed = set(self._files) != set(names)
+            for name in names:
+                path = os.path.join(self.library_dir, name)
+                st = os.stat(path)
+                entry = self._files.get(name)
+                if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                    files[name] = entry
+                    continue
+                with open(path, "rb") as f:
+                    raw = f.read()
+                digest = hashlib.sha256(raw).hexdigest()
+                if entry and entry["sha256"] == digest:
+                    # Touched but identical: keep the parsed record
+                    record = entry["record"]
+                else:
+                    record = self.parse_markdown(raw.decode("utf-8", errors="replace"), os.path.splitext(name)[0])
+                    changed = True
+                files[name] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest, "record": record}
+
+            stats_changed = files != self._files
+            self._files = files
+            if changed or self._index is None:
+                self.records = [files[n]["record"] for n in names]
+                self._index = RuleIndex([
+                    {
+                        "kind": "example",
+                        "name": r["name"],
+                        "group": r["name"],
+                        "text": f"{r['technical_description']}\n{r['business_description']}",
+                    }
+                    for r in self.records
+                ])
+            if changed or stats_changed:
+                self._save_index()
+            return changed
+
+    def search(self, query: str, top_k: int = 2) -> List[Tuple[float, Dict[str, Any]]]:
+        """Up to top_k (score, record) pairs most similar to query, best first."""
+        if time.monotonic() - self._checked_at >= self.refresh_interval:
+            self.refresh()
+        with self._lock:
+            index, records = self._index, self.records
+        by_name = {r["name"]: r for r in records}
+        return [(score, by_name[item["name"]]) for score, item in index.search(query, top_k=top_k)]
+
+    def select(self, query: str, top_k: int = 2, token_budget: Optional[int] = 6000) -> List[Dict[str, Any]]:
+        """
+        Most similar modules for a prompt, best first, skipping any whose rendered
+        example no longer fits into token_budget (None = no cap).
+        """
+        remaining = token_budget if token_budget is not None else float("inf")
+        chosen: List[Dict[str, Any]] = []
+        for _, record in self.search(query, top_k=max(top_k * 3, top_k)):
+            if len(chosen) >= top_k:
+                break
+            cost = TokenEstimator.count(self.render_one(record))
+            if cost > remaining:
+                continue
+            remaining -= cost
+            chosen.append(record)
+        return chosen
+
+    @classmethod
+    def parse_markdown(cls, text: str, name: str) -> Dict[str, Any]:
+        """
+        Parse one library .md into a record with keys name, submitter, email, version,
+        technical_description, business_description and code (empty when a section is missing).
+        """
+        record: Dict[str, Any] = {"name": name, **{key: "" for key in cls.SECTIONS.values()}}
+        heads = list(_SECTION_RE.finditer(text))
+        for i, m in enumerate(heads):
+            key = cls.SECTIONS.get(m.group(1).strip().lower())
+            if key is None:
+                continue
+            end = heads[i + 1].start() if i + 1 < len(heads) else len(text)
+            if key == "code":
+                # The code fence runs to the end of the file ('#' lines inside it are not headings)
+                fenced = _CODE_RE.search(text, m.end())
+                record["code"] = fenced.group(1).strip() if fenced else text[m.end():end].strip()
+                break
+            body = text[m.end():end]
+            if key.endswith("_description"):
+                # Descriptions are often written as JS comments
+                body = "\n".join(re.sub(r"^\s*//\s?", "", line) for line in body.strip().splitlines())
+            record[key] = body.strip()
+        return record
+
+    @staticmethod
+    def render_one(record: Dict[str, Any]) -> str:
+        """One module as a few-shot example."""
+        header = f"### Reference module: {record['name']}"
+        if record.get("version"):
+            header += f" (AUS {record['version']})"
+        parts = [header]
+        if record.get("technical_description"):
+            parts.append(f"Technical description:\n{record['technical_description']}")
+        if record.get("business_description"):
+            parts.append(f"Business description:\n{record['business_description']}")
+        parts.append(f"```javascript\n{record.get('code', '')}\n```")
+        return "\n\n".join(parts)
+
+    @classmethod
+    def render(cls, records: List[Dict[str, Any]]) -> str:
+        """Examples block for the <<EXAMPLES_PLAYBOOK>> slot ("" when there are none)."""
+        return "\n\n".join(cls.render_one(r) for r in records)
+
+    # ------------------------------ helpers ------------------------------
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if not self.index_path or not os.path.exists(self.index_path):
+            return {}
+        try:
+            data = FileReader.read_json(self.index_path)
+        except Exception:
+            return {}
+        if not isinstance(data, dict) or data.get("version") != self.INDEX_VERSION:
+            return {}
+        return data.get("files") or {}
+
+    def _save_index(self) -> None:
+        """Persist the parsed records atomically (a failed write only costs a re-parse)."""
+        if not self.index_path:
+            return
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            FileWriter.write_json({"version": self.INDEX_VERSION, "files": self._files}, tmp, pretty=False)
+            os.replace(tmp, self.index_path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+if __name__ == "__main__":
+    library = ExampleLibrary()
+    query = "Control the swing cuts of the crude tower with splitters and mixers"
+    for score, record in library.search(query, top_k=5):
+        print(f"{score:6.2f}  {record['name']} (v{record['version']}, {len(record['code'])} chars of code)")
@@ -0,0 +1,197 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import re
+from bisect import bisect_right
+from typing import Dict, List, Tuple
+
+
+# Calls on a capitalized object (Simulator.setData(, UnitCache.getOrSet(, ...)
+_CALL_RE = re.compile(r"(?<![\w$.])([A-Z][A-Za-z0-9_$]*)\s*\.\s*([A-Za-z_$][A-Za-z0-9_$]*)\s*\(")
+_NEW_RE = re.compile(r"\bnew\s+([A-Z][A-Za-z0-9_$]*)\s*\(")
+_SEGMENT_OK_RE = re.compile(r"^\S(?:.*\S)?$")
+_WRITE_AFTER_RE = re.compile(r"\s*\]\s*=(?!=)")
+
+# Tokenizer pieces: start of a comment / literal, then the body of each kind
+_START_RE = re.compile(r"//|/\*|['\"`]")
+_LINE_COMMENT_RE = re.compile(r"//[^\n]*")
+_BLOCK_COMMENT_RE = re.compile(r"/\*.*?(?:\*/|\Z)", re.DOTALL)
+_QUOTED_RE = {
+    "'": re.compile(r"'((?:\\.|\\\Z|[^'\\\n])*)", re.DOTALL),
+    '"': re.compile(r'"((?:\\.|\\\Z|[^"\\\n])*)', re.DOTALL),
+}
+_TEMPLATE_CHUNK_RE = re.compile(r"(?:\\.|\\\Z|[^`\\$]|\$(?!\{))*", re.DOTALL)
+_ESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
+_NOT_NEWLINE_RE = re.compile(r"[^\n]")
+
+
+class JsScanner:
+    """
+    Lexical scanner for AUS JavaScript modules (no JS parser dependency).
+
+    Comments are skipped and string / template literals are collected in one
+    pass; the remaining code is searched for API calls. Reported items:
+      - paths:         dotted variable paths found in string literals
+                       ("Units.FCCU.Parameters.Intake"); template interpolations
+                       become the DYNAMIC segment marker ("Units.<*>.Parameters"),
+      - writes:        paths used as assignment keys (obj["Units.X.Parameters.Y"] = ...),
+      - api_calls:     "Object.method" calls on non-builtin capitalized objects,
+                       plus "new Class" constructions,
+      - data_requests: keys of new DataRequest("<key>", ...) requests.
+
+    Each item comes with its 1-based line number in scan_with_lines().
+
+    Typical usage:
+      facts = JsScanner.scan(code)
+      facts["api_calls"]  # ["Log.warning", "Simulator.setData", "UnitCache.getOrSet", "new DataRequest"]
+    """
+
+    DYNAMIC = "<*>"
+    # Standard JS globals, not AUS APIs
+    BUILTINS = frozenset({
+        "Math", "JSON", "Object", "Array", "Number", "String", "Boolean", "Date", "Promise",
+        "Symbol", "Reflect", "Map", "Set", "WeakMap", "WeakSet", "RegExp", "Error", "Intl",
+    })
+
+    # -------------------- Public APIs --------------------
+    @classmethod
+    def scan(cls, code: str) -> Dict[str, List[str]]:
+        """Sorted, de-duplicated paths / writes / api_calls / data_requests of a module."""
+        found = cls.scan_with_lines(code)
+        return {key: sorted({item for item, _ in items}) for key, items in found.items()}
+
+    @classmethod
+    def scan_with_lines(cls, code: str) -> Dict[str, List[Tuple[str, int]]]:
+        """Like scan(), but every occurrence with its line number, in source order."""
+        stripped, literals = cls.tokenize(code)
+        newlines = [m.start() for m in re.finditer("\n", code)]
+        found: Dict[str, List[Tuple[str, int]]] = {"paths": [], "writes": [], "api_calls": [], "data_requests": []}
+
+        def line_of(pos: int) -> int:
+            return bisect_right(newlines, pos - 1) + 1
+
+        for start, end, value in literals:
+            if not cls.is_path(value):
+                continue
+            line = line_of(start)
+            found["paths"].append((value, line))
+            # A literal used as a key in an assignment: obj["..."] = value (not ==)
+            k = start - 1
+            while k >= 0 and stripped[k].isspace():
+                k -= 1
+            if k >= 0 and stripped[k] == "[" and _WRITE_AFTER_RE.match(stripped, end):
+                found["writes"].append((value, line))
+
+        for m in _CALL_RE.finditer(stripped):
+            if m.group(1) not in cls.BUILTINS:
+                found["api_calls"].append((f"{m.group(1)}.{m.group(2)}", line_of(m.start())))
+        for m in _NEW_RE.finditer(stripped):
+            if m.group(1) in cls.BUILTINS:
+                continue
+            line = line_of(m.start())
+            found["api_calls"].append((f"new {m.group(1)}", line))
+            if m.group(1) == "DataRequest":
+                first = next((lit for lit in literals if lit[0] >= m.end()), None)
+                # Only when the key literal is the first argument
+                if first is not None and not stripped[m.end():first[0]].strip():
+                    found["data_requests"].append((first[2], line))
+        found["api_calls"].sort(key=lambda item: item[1])
+        return found
+
+    @classmethod
+    def tokenize(cls, code: str) -> Tuple[str, List[Tuple[str, int, str]]]:
+        """
+        Split code into comment-free text and string literals.
+
+        Returns:
+            (stripped, literals): stripped has the same length and line breaks as
+            code, with comments and literal contents blanked out; literals are
+            (start, end, value) with template interpolations replaced by DYNAMIC.
+        """
+        pieces: List[str] = []
+        literals: List[Tuple[int, int, str]] = []
+        pos, n = 0, len(code)
+        while True:
+            m = _START_RE.search(code, pos)
+            if m is None:
+                break
+            i, token = m.start(), m.group()
+            pieces.append(code[pos:i])
+            if token == "//":
+                end = _LINE_COMMENT_RE.match(code, i).end()
+                pieces.append(" " * (end - i))
+                pos = end
+                continue
+            if token == "/*":
+                end = _BLOCK_COMMENT_RE.match(code, i).end()
+                pieces.append(_NOT_NEWLINE_RE.sub(" ", code[i:end]))
+                pos = end
+                continue
+            if token in _QUOTED_RE:
+                # Runs up to the closing quote, a newline or the end of the code
+                q = _QUOTED_RE[token].match(code, i)
+                j, value = q.end(), _ESCAPE_RE.sub(r"\1", q.group(1))
+            else:
+                j, parts = i + 1, []
+                while True:
+                    chunk = _TEMPLATE_CHUNK_RE.match(code, j)
+                    parts.append(_ESCAPE_RE.sub(r"\1", chunk.group()))
+                    j = chunk.end()
+                    if not code.startswith("${", j):
+                        break
+                    j = cls._skip_interpolation(code, j + 2)
+                    parts.append(cls.DYNAMIC)
+                value = "".join(parts)
+            # The literal ends after the character that stopped it (closing quote, newline
+            # or last character), which is kept; everything in between is blanked
+            end = min(j + 1, n)
+            keep = max(i + 1, end - 1)
+            inner = code[i + 1:keep]
+            blanked = _NOT_NEWLINE_RE.sub(" ", inner) if "\n" in inner else " " * len(inner)
+            pieces.append(token + blanked + code[keep:end])
+            literals.append((i, end, value))
+            pos = end
+        pieces.append(code[pos:])
+        return "".join(pieces), literals
+
+    @classmethod
+    def is_path(cls, value: str) -> bool:
+        """True for dotted variable paths such as "Units.FCCU.Parameters" or "Model.PeriodStart"."""
+        if "\n" in value or "." not in value or not value[:1].isupper():
+            return False
+        segments = value.split(".")
+        if not segments[0].isalnum():
+            return False
+        return all(_SEGMENT_OK_RE.match(seg) for seg in segments)
+
+    # ------------------------------ helpers ------------------------------
+    @staticmethod
+    def _skip_interpolation(code: str, i: int) -> int:
+        """Index just past the "}" closing a ${...} that starts at i (nested braces / strings aware)."""
+        depth, n = 1, len(code)
+        while i < n and depth:
+            ch = code[i]
+            if ch in "'\"`":
+                j = i + 1
+                while j < n and code[j] != ch:
+                    j += 2 if code[j] == "\\" else 1
+                i = j + 1
+                continue
+            if ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+            i += 1
+        return i
+
+
+if __name__ == "__main__":
+    sample = (
+        'const request = new DataRequest("Inputs", () => [`Units.${unit}.Parameters`]);\n'
+        "// Simulator.getData(\"Units.Ignored.Parameters\")\n"
+        'objOutput["Units.Splitter HCU Deprop.Parameters.IDE-C1D"] = 0.5;\n'
+        "Simulator.setData(objOutput);\n"
+    )
+    for key, values in JsScanner.scan(sample).items():
+        print(f"{key}: {values}")
@@ -0,0 +1,213 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import json
+import time
+import hashlib
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from backend.src.data_io.file_reader import FileReader
+from backend.src.data_io.file_writer import FileWriter
+from backend.src.library.example_library import ExampleLibrary
+from backend.src.library.js_scanner import JsScanner
+
+
+class LibraryIndexer:
+    """
+    Incremental indexer for the module library (<name>.md + <name>.js pairs).
+
+    - A manifest (JSON) keeps mtime_ns / size / sha256 for every file. Files whose
+      stat is unchanged are not read at all; files whose stat changed are hashed
+      and only re-parsed when their content changed. Deleted pairs are dropped.
+    - The index is one Parquet file (zstd) with one row per module: metadata from
+      the .md sections, code size, and the paths / writes / API calls / DataRequest
+      keys found by JsScanner. Rows of unchanged modules are copied from the
+      previous index, so an update costs one stat per file plus the changed modules.
+
+    Typical usage:
+      indexer = LibraryIndexer("backend/src/data/ps-code-library-au")
+      summary = indexer.update()    # {"added": [...], "changed": [...], "deleted": [...], "unchanged": 42}
+      table = indexer.read_index()  # pyarrow.Table
+    """
+
+    INDEX_VERSION = "1"
+    EXTENSIONS = (".md", ".js")
+    SCHEMA = pa.schema([
+        ("name", pa.string()),
+        ("submitter", pa.string()),
+        ("email", pa.string()),
+        ("version", pa.string()),
+        ("technical_description", pa.string()),
+        ("business_description", pa.string()),
+        ("md_sha256", pa.string()),
+        ("js_sha256", pa.string()),
+        ("code_lines", pa.int32()),
+        ("code_chars", pa.int32()),
+        ("paths", pa.list_(pa.string())),
+        ("writes", pa.list_(pa.string())),
+        ("api_calls", pa.list_(pa.string())),
+        ("data_requests", pa.list_(pa.string())),
+    ])
+
+    def __init__(
+        self,
+        library_dir: str = "backend/src/data/ps-code-library-au",
+        index_dir: str = "backend/src/outputs/library",
+    ) -> None:
+        """
+        Args:
+            library_dir: Directory holding the <name>.md / <name>.js modules.
+            index_dir: Directory for manifest.json and modules.parquet.
+        """
+        self.library_dir = library_dir
+        self.index_dir = index_dir
+        self.manifest_path = os.path.join(index_dir, "manifest.json")
+        self.index_path = os.path.join(index_dir, "modules.parquet")
+        os.makedirs(index_dir, exist_ok=True)
+
+    # -------------------- Public APIs --------------------
+    def update(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Bring the index in line with library_dir.
+
+        Args:
+            full: Ignore the manifest and re-parse every module.
+
+        Returns:
+            Dict with added / changed / deleted module names and the unchanged count.
+        """
+        manifest = {} if full else self._load_manifest()
+        previous = {} if full or not os.path.exists(self.index_path) else None
+
+        current: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for entry in os.scandir(self.library_dir):
+            stem, ext = os.path.splitext(entry.name)
+            if entry.is_file() and ext.lower() in self.EXTENSIONS:
+                st = entry.stat()
+                current.setdefault(stem, {})[ext.lower()] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+        added: List[str] = []
+        changed: List[str] = []
+        rows: Dict[str, Dict[str, Any]] = {}
+        for name in sorted(current):
+            files = current[name]
+            old = manifest.get(name, {})
+            dirty = False
+            for ext, info in files.items():
+                before = old.get(ext)
+                if before and before["mtime_ns"] == info["mtime_ns"] and before["size"] == info["size"]:
+                    info["sha256"] = before["sha256"]
+                    continue
+                info["sha256"] = self._sha256(os.path.join(self.library_dir, name + ext))
+                dirty = dirty or not before or before["sha256"] != info["sha256"]
+            dirty = dirty or set(files) != set(old)
+            if not dirty:
+                continue
+            (changed if name in manifest else added).append(name)
+            rows[name] = self._build_row(name, files)
+
+        deleted = sorted(set(manifest) - set(current))
+        unchanged = [name for name in sorted(current) if name not in rows]
+        if rows or deleted or not os.path.exists(self.index_path):
+            if previous is None:
+                previous = self._previous_rows(unchanged)
+            missing = [name for name in unchanged if name not in previous]
+            for name in missing:
+                # Manifest and index out of sync (e.g. index deleted): rebuild those rows
+                rows[name] = self._build_row(name, current[name])
+            for name in unchanged:
+                if name in previous:
+                    rows[name] = previous[name]
+            self._write_index([rows[name] for name in sorted(current)])
+        self._save_manifest(current)
+        return {"added": added, "changed": changed, "deleted": deleted, "unchanged": len(unchanged)}
+
+    def read_index(self, columns: Optional[List[str]] = None) -> pa.Table:
+        """The module index as a pyarrow Table (optionally only some columns)."""
+        return pq.read_table(self.index_path, columns=columns)
+
+    # ------------------------------ helpers ------------------------------
+    def _build_row(self, name: str, files: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        md = self._read(name, ".md") if ".md" in files else ""
+        record = ExampleLibrary.parse_markdown(md, name)
+        # The .js file is the deployed module; fall back to the .md code section
+        code = self._read(name, ".js") if ".js" in files else record["code"]
+        facts = JsScanner.scan(code)
+        return {
+            "name": name,
+            "submitter": record["submitter"],
+            "email": record["email"],
+            "version": record["version"],
+            "technical_description": record["technical_description"],
+            "business_description": record["business_description"],
+            "md_sha256": files.get(".md", {}).get("sha256", ""),
+            "js_sha256": files.get(".js", {}).get("sha256", ""),
+            "code_lines": code.count("\n") + 1 if code else 0,
+            "code_chars": len(code),
+            **facts,
+        }
+
+    def _previous_rows(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Rows of the given modules from the existing index ({} if it is missing or unreadable)."""
+        if not names or not os.path.exists(self.index_path):
+            return {}
+        try:
+            table = pq.read_table(self.index_path)
+        except Exception:
+            return {}
+        if table.schema != self.SCHEMA:
+            return {}
+        wanted = set(names)
+        return {row["name"]: row for row in table.to_pylist() if row["name"] in wanted}
+
+    def _write_index(self, rows: List[Dict[str, Any]]) -> None:
+        table = pa.Table.from_pylist(rows, schema=self.SCHEMA)
+        tmp = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, self.index_path)
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            data = FileReader.read_json(self.manifest_path)
+        except Exception:
+            return {}
+        if not isinstance(data, dict) or data.get("version") != self.INDEX_VERSION:
+            return {}
+        return data.get("modules") or {}
+
+    def _save_manifest(self, modules: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+        tmp = f"{self.manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        FileWriter.write_json({"version": self.INDEX_VERSION, "modules": modules}, tmp, pretty=False)
+        os.replace(tmp, self.manifest_path)
+
+    def _read(self, name: str, ext: str) -> str:
+        with open(os.path.join(self.library_dir, name + ext), "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally (re)build the module library index.")
+    parser.add_argument("--library", default="backend/src/data/ps-code-library-au", help="Library directory.")
+    parser.add_argument("--out", default="backend/src/outputs/library", help="Index directory.")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and re-parse every module.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    summary = LibraryIndexer(args.library, args.out).update(full=args.full)
+    print(json.dumps({**summary, "seconds": round(time.perf_counter() - started, 3)}))
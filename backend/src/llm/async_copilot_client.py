@@ -0,0 +1,218 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import asyncio
+import aiohttp
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from backend.src.llm.config_loader import load_github_models_config
+from backend.src.llm.copilot_client import CopilotClient, RETRYABLE_STATUSES
+from backend.src.llm.response_cache import ResponseCache
+from backend.src.llm.rate_limiter import RateLimiter
+
+
+class AsyncCopilotClient:
+    """
+    asyncio counterpart of CopilotClient for generating many independent replies at once.
+    - One pooled aiohttp connector (keep-alive connections) shared by all requests.
+    - A semaphore caps the number of in-flight requests.
+    - Same payload defaults and retry semantics as CopilotClient (429/5xx, Retry-After or
+      jittered backoff), and the same process-wide RateLimiter, so threads and tasks
+      share one request/token budget.
+
+    Typical usage:
+      async with AsyncCopilotClient(max_concurrency=8) as client:
+          replies = await client.chat_many([(system_prompt, user_a), (system_prompt, user_b)])
+    """
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+        top_p: float = 1.0,
+        max_tokens: int = 2048,
+        request_timeout: int = 120,
+        retries: int = 3,
+        backoff: float = 1.6,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_concurrency: int = 8,
+        connection_limit: Optional[int] = None,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        """
+        Args:
+            model: Model id, e.g. "openai/gpt-4.1". Defaults to config file value.
+            temperature: Sampling temperature.
+            top_p: Nucleus sampling.
+            max_tokens: Max tokens to generate per call.
+            request_timeout: HTTP timeout in seconds (per attempt).
+            retries: Automatic retries for 429/5xx.
+            backoff: Exponential backoff factor (seconds^attempt, jittered); Retry-After wins when sent.
+            api_key, base_url: Optional overrides; otherwise loaded from config.
+            max_concurrency: Maximum number of concurrent in-flight requests.
+            connection_limit: Size of the connection pool; defaults to max_concurrency.
+            cache: Optional ResponseCache shared with sync clients (use_cache=False bypasses it).
+            rate_limiter: Optional RateLimiter; defaults to the process-wide one for this base_url/model.
+        """
+        cfg = load_github_models_config()
+        self.api_key = api_key or cfg["api_key"]
+        self.base_url = (base_url or cfg["base_url"]).rstrip("/")
+        self.model = model or cfg["model"]
+
+        self.temperature = float(temperature)
+        self.top_p = float(top_p)
+        self.max_tokens = int(max_tokens)
+        self.request_timeout = int(request_timeout)
+        self.retries = int(retries)
+        self.backoff = float(backoff)
+        self.max_concurrency = int(max_concurrency)
+        self.connection_limit = int(connection_limit or max_concurrency)
+        self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter.shared(f"{self.base_url}|{self.model}")
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._common_headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "Content-Type": "application/json",
+        }
+
+    # ---------- Lifecycle ----------
+
+    async def __aenter__(self) -> "AsyncCopilotClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session (safe to call more than once)."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the pooled session lazily, inside the running event loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.connection_limit)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self._common_headers,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            )
+        return self._session
+
+    # ---------- Core calls ----------
+
+    async def chat_raw(
+        self,
+        messages: List[Dict[str, str]],
+        **overrides: Any,
+    ) -> Dict[str, Any]:
+        """
+        Call /inference/chat/completions and return the raw JSON payload.
+
+        Args:
+            messages: OpenAI-style messages list.
+            **overrides: Optional payload overrides, e.g. {"max_tokens": 4096};
+                use_cache=False bypasses the response cache for this call.
+
+        Returns:
+            Dict[str, Any]: Raw response JSON from the API.
+        """
+        use_cache = overrides.pop("use_cache", True)
+        url = f"{self.base_url}/inference/chat/completions"
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "stream": False,
+        }
+        payload.update(overrides or {})
+
+        key = None
+        if self.cache is not None and use_cache:
+            key = self.cache.make_key(payload)
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                return cached
+
+        session = self._get_session()
+        tokens = RateLimiter.estimate_request_tokens(payload)
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = self.rate_limiter.reserve(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            # Only hold a concurrency slot while the request is actually in flight
+            async with self._semaphore:
+                async with session.post(url, json=payload) as resp:
+                    self.rate_limiter.update_from_headers(resp.headers)
+                    retry = resp.status in RETRYABLE_STATUSES and attempt <= self.retries
+                    if not retry:
+                        resp.raise_for_status()
+                        data = await resp.json(content_type=None)
+                        if key is not None and data.get("choices"):
+                            await asyncio.to_thread(self.cache.put, key, data)
+                        return data
+                    delay = self.rate_limiter.backoff_delay(attempt, self.backoff, resp.headers, resp.status)
+            await asyncio.sleep(delay)
+
+    async def chat_text(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        extra_messages: Optional[List[Dict[str, str]]] = None,
+        **overrides: Any,
+    ) -> str:
+        """
+        High-level convenience: compose messages and return assistant text only.
+        """
+        messages = CopilotClient.compose_messages(system_prompt, user_prompt, extra_messages)
+        data = await self.chat_raw(messages, **overrides)
+        try:
+            return data["choices"][0]["message"]["content"]
+        except Exception:
+            return str(data)
+
+    async def chat_many(
+        self,
+        prompts: Sequence[Tuple[str, str]],
+        return_exceptions: bool = True,
+        **overrides: Any,
+    ) -> List[Union[str, BaseException]]:
+        """
+        Run several (system_prompt, user_prompt) generations concurrently
+        (bounded by max_concurrency) and return the replies in input order.
+
+        Args:
+            prompts: Sequence of (system_prompt, user_prompt) pairs.
+            return_exceptions: If True, failed generations yield their exception
+                instead of cancelling the whole batch.
+            **overrides: Payload overrides applied to every call.
+        """
+        tasks = [self.chat_text(system, user, **overrides) for system, user in prompts]
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
+
+if __name__ == "__main__":
+    SYSTEM = "You are an expert JavaScript code generator specialized in refinery process simulation logic."
+    UNITS = ["AT1X", "AT2X", "LPX2", "Vacuum Unit #1"]
+
+    async def _demo() -> None:
+        async with AsyncCopilotClient(max_concurrency=4) as client:
+            replies = await client.chat_many(
+                [(SYSTEM, f"Write a short JS module that logs the parameters of unit '{u}'.") for u in UNITS]
+            )
+        for unit, reply in zip(UNITS, replies):
+            print(f"\n=== {unit} ===\n{reply}")
+
+    asyncio.run(_demo())
@@ -2,10 +2,16 @@ import os
 import sys 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
+import json
 import time
 import requests
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
 from backend.src.llm.config_loader import load_github_models_config
+from backend.src.llm.response_cache import ResponseCache
+from backend.src.llm.rate_limiter import RateLimiter
+
+# HTTP statuses that are retried with backoff (shared with AsyncCopilotClient)
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
 
 
 class CopilotClient:
@@ -26,6 +32,8 @@ class CopilotClient:
         backoff: float = 1.6,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
     ) -> None:
         """
         Args:
@@ -35,8 +43,12 @@ class CopilotClient:
             max_tokens: Max tokens to generate per call.
             request_timeout: HTTP timeout in seconds.
             retries: Automatic retries for 429/5xx.
-            backoff: Exponential backoff factor (seconds^attempt).
+            backoff: Exponential backoff factor (seconds^attempt, jittered); Retry-After wins when sent.
             api_key, base_url: Optional overrides; otherwise loaded from config.
+            cache: Optional ResponseCache; identical requests are then answered locally.
+                Pass use_cache=False to a call to bypass it.
+            rate_limiter: Optional RateLimiter; defaults to the process-wide one for
+                this base_url/model, shared with every other client in the process.
         """
         cfg = load_github_models_config()
         self.api_key = api_key or cfg["api_key"]
@@ -49,6 +61,8 @@ class CopilotClient:
         self.request_timeout = int(request_timeout)
         self.retries = int(retries)
         self.backoff = float(backoff)
+        self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter.shared(f"{self.base_url}|{self.model}")
 
         self.session = requests.Session()
         self._common_headers = {
@@ -96,31 +110,87 @@ class CopilotClient:
 
         Args:
             messages: OpenAI-style messages list.
-            **overrides: Optional payload overrides, e.g. {"max_tokens": 4096}.
+            **overrides: Optional payload overrides, e.g. {"max_tokens": 4096};
+                use_cache=False bypasses the response cache for this call.
 
         Returns:
             Dict[str, Any]: Raw response JSON from the API.
         """
-        url = f"{self.base_url}/inference/chat/completions"
-        payload: Dict[str, Any] = {
-            "model": self.model,
-            "messages": messages,
-            "max_tokens": self.max_tokens,
-            "temperature": self.temperature,
-            "top_p": self.top_p,
-            "stream": False,  # non-stream for simplicity
-        }
-        payload.update(overrides or {})
+        use_cache = overrides.pop("use_cache", True)
+        payload = self._build_payload(messages, overrides, stream=False)
 
-        attempt = 0
-        while True:
-            attempt += 1
-            resp = self.session.post(url, headers=self._common_headers, json=payload, timeout=self.request_timeout)
-            if resp.status_code in (429, 500, 502, 503, 504) and attempt <= self.retries:
-                time.sleep(self.backoff ** attempt)
-                continue
-            resp.raise_for_status()
-            return resp.json()
+        key = None
+        if self.cache is not None and use_cache:
+            key = self.cache.make_key(payload)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        data = self._post_chat(payload).json()
+        if key is not None and data.get("choices"):
+            self.cache.put(key, data)
+        return data
+
+    def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        **overrides: Any,
+    ) -> Iterator[str]:
+        """
+        Call /inference/chat/completions with "stream": true and yield the assistant
+        content deltas as they arrive (Server-Sent Events).
+
+        Retries for 429/5xx only happen before the first byte is received.
+        On a response cache hit the whole cached reply is yielded at once; a
+        completed stream is stored in the cache like a non-streamed reply.
+
+        Args:
+            messages: OpenAI-style messages list.
+            **overrides: Optional payload overrides, e.g. {"max_tokens": 4096};
+                use_cache=False bypasses the response cache for this call.
+
+        Yields:
+            Text fragments of the assistant reply, in order.
+        """
+        use_cache = overrides.pop("use_cache", True)
+        payload = self._build_payload(messages, overrides, stream=True)
+
+        key = None
+        if self.cache is not None and use_cache:
+            key = self.cache.make_key(payload)
+            cached = self.cache.get(key)
+            if cached is not None:
+                try:
+                    yield cached["choices"][0]["message"]["content"]
+                    return
+                except (KeyError, IndexError, TypeError):
+                    pass
+
+        parts: List[str] = []
+        resp = self._post_chat(payload)
+        resp.encoding = "utf-8"
+        try:
+            for line in resp.iter_lines(decode_unicode=True):
+                # SSE frames look like "data: {...}"; blank lines and comments separate events
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+                for choice in chunk.get("choices") or []:
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        finally:
+            resp.close()
+
+        if key is not None and parts:
+            self.cache.put(key, {"choices": [{"message": {"role": "assistant", "content": "".join(parts)}}]})
 
     def chat_text(
         self,
@@ -149,6 +219,50 @@ class CopilotClient:
         except Exception:
             return str(data)
 
+    # ---------- Internal ----------
+
+    def _build_payload(self, messages: List[Dict[str, str]], overrides: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        """Chat completion request body with client defaults and per-call overrides."""
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "stream": stream,
+        }
+        payload.update(overrides or {})
+        return payload
+
+    def _post_chat(self, payload: Dict[str, Any]) -> requests.Response:
+        """
+        POST a chat completion request through the shared rate limiter, retrying
+        429/5xx after Retry-After (if sent) or a jittered exponential backoff.
+        """
+        url = f"{self.base_url}/inference/chat/completions"
+        stream = bool(payload.get("stream"))
+        tokens = RateLimiter.estimate_request_tokens(payload)
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = self.rate_limiter.reserve(tokens)
+            if wait > 0:
+                time.sleep(wait)
+            resp = self.session.post(
+                url,
+                headers=self._common_headers,
+                json=payload,
+                timeout=self.request_timeout,
+                stream=stream,
+            )
+            self.rate_limiter.update_from_headers(resp.headers)
+            if resp.status_code in RETRYABLE_STATUSES and attempt <= self.retries:
+                resp.close()
+                time.sleep(self.rate_limiter.backoff_delay(attempt, self.backoff, resp.headers, resp.status_code))
+                continue
+            resp.raise_for_status()
+            return resp
+
     # ---------- Utilities ----------
 
     def list_models(self) -> Any:
@@ -2,24 +2,51 @@ import os
 import sys 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
 from langchain_community.chat_models import ChatOllama
 
 class LLMCoderHandler:
-    def __init__(self, model_name: str = "llama3.1:8b-instruct-q4_K_M", base_url: str = "http://172.22.5.186:32000/ollama-dev", temperature: float = 0.0) -> None:
+    def __init__(
+        self,
+        model_name: str = "llama3.1:8b-instruct-q4_K_M",
+        base_url: str = "http://172.22.5.186:32000/ollama-dev",
+        temperature: float = 0.0,
+        num_ctx: int = 32768,
+        keep_alive: Optional[Union[int, str]] = "30m",
+        max_concurrency: int = 4,
+    ) -> None:
         """
         Initialize LLMCoderHandler.
 
+        One ChatOllama instance is created here and reused by every call, so all
+        requests carry the same options (num_ctx in particular: a different context
+        size makes Ollama reload the model).
+
         Args:
             model_name (str): The name of the model to be used.
             base_url (str): The base URL of the model service.
             temperature (float): The temperature parameter for response generation.
+            num_ctx (int): Context window requested from Ollama for every call.
+            keep_alive (int | str | None): How long Ollama keeps the model loaded after a
+                request (e.g. "30m", seconds, -1 = forever, None = server default).
+            max_concurrency (int): Maximum parallel requests for batch()/abatch().
         """
         self.model_name = model_name
         self.base_url = base_url
         self.temperature = temperature
+        self.num_ctx = num_ctx
+        self.keep_alive = keep_alive
+        self.max_concurrency = max_concurrency
         
         try:
-            self.model = ChatOllama(model=self.model_name, base_url=self.base_url, temperature=self.temperature, num_ctx=32768)
+            self.model = ChatOllama(
+                model=self.model_name,
+                base_url=self.base_url,
+                temperature=self.temperature,
+                num_ctx=self.num_ctx,
+                keep_alive=self.keep_alive,
+            )
         except Exception as e:
             raise ConnectionError(f"Failed to initialize model '{self.model_name}' at {self.base_url}: {e}")
 
@@ -48,21 +75,76 @@ class LLMCoderHandler:
         Returns:
             str: The response content generated by the model.
         """
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+        messages = self._messages(system_prompt, user_prompt)
 
         # print(f"Sending messages to model: {messages}")
 
         try:
-            # Create a fresh ChatOllama instance every time
-            self.model = ChatOllama(model=self.model_name, base_url=self.base_url, temperature=self.temperature)
-            response = self.model.invoke(messages, options={"max_tokens": max_tokens})
+            # num_predict is merged into the instance's options (options={...} would replace them)
+            response = self.model.invoke(messages, num_predict=max_tokens)
         except Exception as e:
             raise RuntimeError(f"Error occurred during model invocation: {e}")
 
+        return self._content(response)
+
+    def batch(self, prompts: Sequence[Tuple[str, str]], max_tokens: int = 32768) -> List[str]:
+        """
+        Runs several (system_prompt, user_prompt) pairs against the model in parallel.
+
+        Args:
+            prompts (Sequence[Tuple[str, str]]): The (system_prompt, user_prompt) pairs.
+            max_tokens (int): The maximum number of tokens to generate per response.
+
+        Returns:
+            List[str]: The response contents, in the order of prompts.
+        """
+        try:
+            responses = self.model.batch(
+                [self._messages(system, user) for system, user in prompts],
+                config={"max_concurrency": self.max_concurrency},
+                num_predict=max_tokens,
+            )
+        except Exception as e:
+            raise RuntimeError(f"Error occurred during batch model invocation: {e}")
+
+        return [self._content(response) for response in responses]
+
+    async def ahandle_chat(self, system_prompt: str, user_prompt: str, max_tokens: int = 32768) -> str:
+        """
+        Async variant of handle_chat.
+        """
+        try:
+            response = await self.model.ainvoke(self._messages(system_prompt, user_prompt), num_predict=max_tokens)
+        except Exception as e:
+            raise RuntimeError(f"Error occurred during model invocation: {e}")
+
+        return self._content(response)
+
+    async def abatch(self, prompts: Sequence[Tuple[str, str]], max_tokens: int = 32768) -> List[str]:
+        """
+        Async variant of batch.
+        """
+        try:
+            responses = await self.model.abatch(
+                [self._messages(system, user) for system, user in prompts],
+                config={"max_concurrency": self.max_concurrency},
+                num_predict=max_tokens,
+            )
+        except Exception as e:
+            raise RuntimeError(f"Error occurred during batch model invocation: {e}")
+
+        return [self._content(response) for response in responses]
+
+    @staticmethod
+    def _messages(system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    @staticmethod
+    def _content(response) -> str:
         if response and hasattr(response, 'content'):
             return response.content
         else:
-            raise ValueError("Received invalid response from the model.")
\ No newline at end of file
+            raise ValueError("Received invalid response from the model.")
@@ -0,0 +1,210 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+
+from backend.src.llm.token_estimator import TokenEstimator
+
+
+class RateLimiter:
+    """
+    Process-wide request / token budget scheduler for GitHub Models calls.
+
+    - Two token buckets (requests-per-minute, tokens-per-minute) refilled continuously.
+      Budgets start from the configured defaults and are re-learned from the
+      x-ratelimit-* headers of every response.
+    - reserve() books a call and returns how long the caller must wait first, so
+      concurrent callers are spread out instead of bursting into 429s.
+    - backoff_delay() honors Retry-After (and, on 429, x-ratelimit-reset-*) by pausing
+      every caller sharing the limiter; otherwise (e.g. 5xx) it uses jittered
+      exponential backoff.
+
+    Thread-safe and usable from asyncio: the lock is only held for bookkeeping,
+    callers sleep with time.sleep or asyncio.sleep themselves.
+
+    Typical usage:
+      limiter = RateLimiter.shared("https://models.github.ai|openai/gpt-4.1")
+      time.sleep(limiter.reserve(estimated_tokens))
+    """
+
+    # Upper bound on a wait derived from x-ratelimit-reset-* (a daily window can report hours)
+    MAX_RESET_WAIT = 60.0
+
+    _registry: Dict[str, "RateLimiter"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        period_seconds: float = 60.0,
+    ) -> None:
+        """
+        Args:
+            requests_per_minute: Initial request budget; None = unlimited until headers say otherwise.
+            tokens_per_minute: Initial token budget; None = unlimited until headers say otherwise.
+            period_seconds: Renewal period of the budgets (overridden by x-ratelimit-renewalperiod-* headers).
+        """
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Dict[str, Optional[float]]] = {}
+        now = time.monotonic()
+        for name, limit in (("requests", requests_per_minute), ("tokens", tokens_per_minute)):
+            self._buckets[name] = {
+                "limit": float(limit) if limit else None,
+                "period": float(period_seconds),
+                "level": float(limit) if limit else None,
+                "updated": now,
+            }
+        self._blocked_until = 0.0
+
+    @classmethod
+    def shared(cls, key: str = "default") -> "RateLimiter":
+        """Return the process-wide limiter for key (e.g. "<base_url>|<model>"), creating it on first use."""
+        with cls._registry_lock:
+            if key not in cls._registry:
+                cls._registry[key] = cls()
+            return cls._registry[key]
+
+    # -------------------- Scheduling --------------------
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Book one request costing about `tokens` tokens.
+
+        Returns:
+            Seconds the caller should wait before sending (0.0 if within budget).
+        """
+        now = time.monotonic()
+        with self._lock:
+            wait = max(0.0, self._blocked_until - now)
+            for name, cost in (("requests", 1.0), ("tokens", float(tokens))):
+                b = self._refill(name, now)
+                if b["limit"] is None or cost <= 0:
+                    continue
+                cost = min(cost, b["limit"])
+                if b["level"] < cost:
+                    rate = b["limit"] / b["period"]
+                    wait = max(wait, (cost - b["level"]) / rate)
+                # Book now (the level may go negative) so later callers queue behind this one
+                b["level"] -= cost
+        return wait
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Learn limits / remaining budgets from x-ratelimit-* response headers."""
+        h = {k.lower(): v for k, v in (headers or {}).items()}
+        now = time.monotonic()
+        with self._lock:
+            for name in ("requests", "tokens"):
+                limit = self._number(h.get(f"x-ratelimit-limit-{name}"))
+                remaining = self._number(h.get(f"x-ratelimit-remaining-{name}"))
+                period = self._number(h.get(f"x-ratelimit-renewalperiod-{name}"))
+                b = self._refill(name, now)
+                if period:
+                    b["period"] = period
+                if limit:
+                    if b["limit"] is None:
+                        b["level"] = limit
+                    b["limit"] = limit
+                if remaining is not None and b["limit"] is not None:
+                    # The server's view wins when it is stricter than ours
+                    b["level"] = min(b["level"], remaining)
+
+    def backoff_delay(
+        self,
+        attempt: int,
+        backoff: float,
+        headers: Optional[Mapping[str, str]] = None,
+        status: Optional[int] = None,
+    ) -> float:
+        """
+        Delay before retrying a throttled / failed call.
+
+        Uses Retry-After when present, and on 429 also x-ratelimit-reset-* (when the
+        exhausted quota renews, at most MAX_RESET_WAIT seconds), pausing every caller
+        of this limiter until then.
+        Otherwise (e.g. a 5xx) jittered backoff ** attempt for this caller only.
+        """
+        hinted = self._retry_after(headers or {}, throttled=status == 429)
+        if hinted is not None:
+            delay = hinted + random.uniform(0.0, 0.25)
+            with self._lock:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            return delay
+        base = backoff ** attempt
+        return base / 2.0 + random.uniform(0.0, base / 2.0)
+
+    # ------------------------------ helpers ------------------------------
+    @staticmethod
+    def estimate_request_tokens(payload: Dict[str, Any]) -> int:
+        """Token cost of a request: estimated prompt tokens plus the completion cap."""
+        prompt = TokenEstimator.count_messages(payload.get("messages") or [])
+        return prompt + int(payload.get("max_tokens") or 0)
+
+    def _refill(self, name: str, now: float) -> Dict[str, Optional[float]]:
+        b = self._buckets[name]
+        if b["limit"] is not None:
+            rate = b["limit"] / b["period"]
+            b["level"] = min(b["limit"], b["level"] + (now - b["updated"]) * rate)
+        b["updated"] = now
+        return b
+
+    @classmethod
+    def _retry_after(cls, headers: Mapping[str, str], throttled: bool = False) -> Optional[float]:
+        h = {k.lower(): v for k, v in headers.items()}
+        value = h.get("retry-after")
+        if value is not None:
+            seconds = cls._number(value)
+            if seconds is not None:
+                return max(0.0, seconds)
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+        if not throttled:
+            # Reset headers say when the quota window renews; only a wait hint for a 429
+            return None
+        resets = {name: cls._duration(h.get(f"x-ratelimit-reset-{name}")) for name in ("requests", "tokens")}
+        resets = {name: r for name, r in resets.items() if r is not None}
+        if not resets:
+            return None
+        # Wait for the bucket that ran out; the other one may renew much later and is not the cause
+        exhausted = [r for name, r in resets.items() if cls._number(h.get(f"x-ratelimit-remaining-{name}")) == 0]
+        wait = min(exhausted or resets.values())
+        return min(max(0.0, wait), cls.MAX_RESET_WAIT)
+
+    @staticmethod
+    def _number(value: Optional[str]) -> Optional[float]:
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    @classmethod
+    def _duration(cls, value: Optional[str]) -> Optional[float]:
+        """Parse "12", "1.5s", "6m0s", "250ms" style durations (seconds)."""
+        if not value:
+            return None
+        plain = cls._number(value)
+        if plain is not None:
+            return plain
+        total, num = 0.0, ""
+        i = 0
+        while i < len(value):
+            ch = value[i]
+            if ch.isdigit() or ch == ".":
+                num += ch
+            elif value.startswith("ms", i):
+                total += float(num or 0) / 1000.0
+                num = ""
+                i += 1
+            elif ch in "hms":
+                total += float(num or 0) * {"h": 3600.0, "m": 60.0, "s": 1.0}[ch]
+                num = ""
+            else:
+                return None
+            i += 1
+        return total
@@ -0,0 +1,152 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of chat completion responses, stored in SQLite.
+
+    - Key: SHA-256 over the model, the normalized messages list and all sampling
+      params of the request payload ("stream" is ignored, so streamed and
+      non-streamed calls share entries).
+    - Entries expire after ttl_seconds; beyond max_entries / max_bytes the least
+      recently used entries are evicted.
+    - hits / misses counters are kept per instance.
+
+    Typical usage:
+      client = CopilotClient(cache=ResponseCache())
+      client.chat_raw(messages)                    # cached
+      client.chat_raw(messages, use_cache=False)   # bypass for this call
+    """
+
+    def __init__(
+        self,
+        db_path: str = "backend/src/outputs/cache/responses.sqlite3",
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        max_entries: int = 5000,
+        max_bytes: int = 200 * 1024 * 1024,
+    ) -> None:
+        """
+        Args:
+            db_path: SQLite file; created if missing.
+            ttl_seconds: Entry lifetime; None disables expiry.
+            max_entries: Maximum number of cached responses.
+            max_bytes: Maximum total size of cached payloads (UTF-8 bytes).
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " payload TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+
+    # -------------------- Public APIs --------------------
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        """
+        Build the cache key for a chat completion request payload.
+
+        Messages are reduced to role/content with normalized line endings and
+        trailing whitespace, so cosmetic differences do not cause misses.
+        """
+        messages = [
+            {
+                "role": m.get("role", ""),
+                "content": "\n".join(line.rstrip() for line in str(m.get("content", "")).replace("\r\n", "\n").split("\n")).strip(),
+            }
+            for m in payload.get("messages") or []
+        ]
+        material = {k: v for k, v in payload.items() if k not in ("messages", "stream")}
+        material["messages"] = messages
+        raw = json.dumps(material, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for key (refreshing its LRU position), or None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT created_at, payload FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self._expired(row[0], now):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[1])
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        """Store a response and evict expired / least recently used entries if over limits."""
+        data = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, created_at, accessed_at, size, payload) VALUES (?, ?, ?, ?, ?)",
+                (key, now, now, len(data.encode("utf-8")), data),
+            )
+            self._evict(now)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters plus current entry count and payload bytes."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": int(entries), "bytes": int(size)}
+
+    def clear(self) -> None:
+        """Remove all entries and reset counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self.hits = 0
+            self.misses = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # -------------------- Internal --------------------
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones until within limits (lock held)."""
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+
+        drop = 0
+        for (row_size,) in self._conn.execute("SELECT size FROM responses ORDER BY accessed_at ASC"):
+            if entries - drop <= self.max_entries and size <= self.max_bytes:
+                break
+            drop += 1
+            size -= row_size
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+            (drop,),
+        )
@@ -0,0 +1,97 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+try:  # optional: exact BPE counts when tiktoken and its encoding files are available
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+
+# Pieces roughly aligned with GPT-style pre-tokenization: letter runs, 1-3 digit
+# groups, single symbols / non-Latin characters, whitespace runs.
+_PIECE_RE = re.compile(r"[A-Za-z]+|\d{1,3}|\s+|[^\sA-Za-z\d]")
+
+
+class TokenEstimator:
+    """
+    Offline token counter for prompt budgeting (history trimming, retrieval budgets,
+    rate-limit reservations).
+
+    - Uses tiktoken (o200k_base) when it is installed and its encoding can be
+      loaded; otherwise a regex heuristic tuned to over- rather than under-count
+      English prose and JavaScript.
+    - Counts are memoized per text, so re-counting an unchanged history costs a
+      dictionary lookup per message.
+
+    Typical usage:
+      n = TokenEstimator.count(reply_text)
+      total = TokenEstimator.count_messages(messages)
+    """
+
+    # Per-message framing added by the chat format (role, separators)
+    MESSAGE_OVERHEAD = 4
+    # Tokens priming the assistant reply
+    REPLY_OVERHEAD = 3
+    ENCODING_NAME = "o200k_base"
+
+    _encoding = None
+    _encoding_loaded = False
+
+    @staticmethod
+    @lru_cache(maxsize=16384)
+    def count(text: str) -> int:
+        """Estimated number of tokens in text (memoized)."""
+        if not text:
+            return 0
+        encoding = TokenEstimator._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return TokenEstimator._heuristic(text)
+
+    @classmethod
+    def count_message(cls, message: Dict[str, str]) -> int:
+        """Tokens of one chat message including the per-message framing."""
+        return cls.MESSAGE_OVERHEAD + cls.count(message.get("content") or "")
+
+    @classmethod
+    def count_messages(cls, messages: List[Dict[str, str]]) -> int:
+        """Tokens of a whole messages list as sent to the chat API."""
+        return sum(cls.count_message(m) for m in messages) + cls.REPLY_OVERHEAD
+
+    # ------------------------------ helpers ------------------------------
+    @classmethod
+    def _get_encoding(cls) -> Optional[object]:
+        if not cls._encoding_loaded:
+            cls._encoding_loaded = True
+            if tiktoken is not None:
+                try:
+                    cls._encoding = tiktoken.get_encoding(cls.ENCODING_NAME)
+                except Exception:
+                    # Encoding files not cached and no network: stay offline
+                    cls._encoding = None
+        return cls._encoding
+
+    @staticmethod
+    def _heuristic(text: str) -> int:
+        total = 0
+        for piece in _PIECE_RE.findall(text):
+            first = piece[0]
+            if first.isalpha() and first.isascii():
+                # Common words are one token; long identifiers split every ~5 letters
+                total += (len(piece) + 4) // 5
+            elif first.isspace():
+                # A single space merges into the next word; newlines / indentation do not
+                total += 0 if piece == " " else 1
+            else:
+                total += 1
+        return max(1, total)
+
+
+if __name__ == "__main__":
+    sample = 'const intake = Simulator.getData("Units.FCCU.Parameters.Intake"); // barrels'
+    print(f"{TokenEstimator.count(sample)} tokens: {sample}")
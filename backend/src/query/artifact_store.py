@@ -0,0 +1,116 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Set
+
+
+# Only fences whose info string is a bare language tag, so hydrate(dehydrate(x)) == x
+_FENCE_RE = re.compile(r"```([A-Za-z]*)\n(.*?)```", re.DOTALL)
+_REF_RE = re.compile(r"<<ARTIFACT:([A-Za-z]*):([0-9a-f]{64})>>")
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for code artifacts (generated JS modules).
+
+    Fenced code blocks in assistant replies are replaced by short references
+    (<<ARTIFACT:<lang>:<sha256>>>) before a message is persisted, and each
+    distinct body is written once to <root>/<hh>/<sha256>.txt. Identical modules
+    across turns and sessions therefore cost one file.
+
+    When messages are sent to the model, hydrate() expands the references that
+    should be shown in full (typically only the latest module) and turns the
+    others into a one-line stub.
+
+    Typical usage:
+      store = ArtifactStore()
+      stored = store.dehydrate(reply)                   # persisted form
+      outgoing = store.hydrate(stored, keep={latest})   # what the model sees
+    """
+
+    SUPERSEDED_STUB = (
+        "```javascript\n// [superseded] Earlier version of the module; "
+        "the current version appears later in this conversation.\n```"
+    )
+    MISSING_STUB = "```javascript\n// [missing artifact]\n```"
+
+    def __init__(self, root: str = "backend/src/outputs/artifacts", memory_items: int = 256) -> None:
+        """
+        Args:
+            root: Directory holding the artifact files.
+            memory_items: Number of artifact bodies kept in an in-process LRU.
+        """
+        self.root = root
+        self.memory_items = int(memory_items)
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    # -------------------- Public APIs --------------------
+    def put(self, body: str) -> str:
+        """Store a body (no-op if already present) and return its SHA-256 hex digest."""
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        self._remember(digest, body)
+        return digest
+
+    def get(self, digest: str) -> Optional[str]:
+        """Return the body for a digest, or None if it is not stored."""
+        with self._lock:
+            if digest in self._memory:
+                self._memory.move_to_end(digest)
+                return self._memory[digest]
+        path = self._path(digest)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            body = f.read()
+        self._remember(digest, body)
+        return body
+
+    def dehydrate(self, text: str) -> str:
+        """Replace every fenced code block in text by a reference to its stored body."""
+        return _FENCE_RE.sub(lambda m: f"<<ARTIFACT:{m.group(1)}:{self.put(m.group(2))}>>", text or "")
+
+    def hydrate(self, text: str, keep: Optional[Set[str]] = None) -> str:
+        """
+        Expand references back into fenced blocks.
+
+        Args:
+            text: Stored message content.
+            keep: Digests to expand in full; None expands all. Others become SUPERSEDED_STUB.
+        """
+        def expand(m: "re.Match[str]") -> str:
+            lang, digest = m.group(1), m.group(2)
+            if keep is not None and digest not in keep:
+                return self.SUPERSEDED_STUB
+            body = self.get(digest)
+            return f"```{lang}\n{body}```" if body is not None else self.MISSING_STUB
+        return _REF_RE.sub(expand, text or "")
+
+    @staticmethod
+    def refs(text: str) -> List[str]:
+        """Digests referenced in text, in order of appearance."""
+        return [m.group(2) for m in _REF_RE.finditer(text or "")]
+
+    # ------------------------------ helpers ------------------------------
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.txt")
+
+    def _remember(self, digest: str, body: str) -> None:
+        with self._lock:
+            self._memory[digest] = body
+            self._memory.move_to_end(digest)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
@@ -0,0 +1,241 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import re
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from backend.src.data_io.file_reader import FileReader
+from backend.src.data_io.file_writer import FileWriter
+from backend.src.query.user_query_runner import UserQueryRunner
+from backend.src.llm.async_copilot_client import AsyncCopilotClient
+from backend.src.query.code_patch import CodePatcher
+
+
+_UNSAFE_NAME_RE = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+class BatchRunner:
+    """
+    Generate JS modules for many user queries in one run.
+
+    Pipeline:
+      1) Load queries from a directory (*.txt / *.md, one query per file) or a JSONL file.
+      2) Compile the rules workbook once (RulesCache) and build prompts per query.
+      3) Dispatch model calls through a bounded pool of async workers.
+      4) Write each module to <output_dir>/modules/<id>.js and one record per query
+         to <output_dir>/manifest.jsonl.
+
+    The manifest doubles as a checkpoint: on restart, queries already recorded as
+    "ok" (with their module on disk) are skipped.
+    """
+
+    def __init__(
+        self,
+        rules_xlsx_path: str,
+        system_prompt_path: str,
+        user_prompt_path: str,
+        output_dir: str = "backend/src/outputs/batch",
+        max_workers: int = 4,
+        runner: Optional[UserQueryRunner] = None,
+        client: Optional[AsyncCopilotClient] = None,
+    ) -> None:
+        """
+        Args:
+            rules_xlsx_path: Path to the rules workbook.
+            system_prompt_path: System prompt template.
+            user_prompt_path: User prompt template.
+            output_dir: Directory for generated modules and the manifest.
+            max_workers: Maximum number of concurrent model calls.
+            runner: Optional UserQueryRunner used to build prompts (only its prompt building
+                is used; model calls go through the async client).
+            client: Optional AsyncCopilotClient; if None, one is created per run.
+        """
+        self.rules_xlsx_path = rules_xlsx_path
+        self.system_prompt_path = system_prompt_path
+        self.user_prompt_path = user_prompt_path
+        self.output_dir = output_dir
+        self.max_workers = int(max_workers)
+        self.runner = runner or UserQueryRunner()
+        self.client = client
+
+        self.modules_dir = os.path.join(output_dir, "modules")
+        self.manifest_path = os.path.join(output_dir, "manifest.jsonl")
+        os.makedirs(self.modules_dir, exist_ok=True)
+
+    # -------------------- Public APIs --------------------
+    @staticmethod
+    def load_queries(source: str) -> List[Dict[str, str]]:
+        """
+        Load queries from a directory (each *.txt / *.md file is one query, id = file name
+        without extension) or from a JSONL file ({"id": ..., "query": ...} per line).
+
+        Returns:
+            List of {"id": str, "query": str} in a stable order.
+        """
+        queries: List[Dict[str, str]] = []
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                stem, ext = os.path.splitext(name)
+                if ext.lower() not in (".txt", ".md"):
+                    continue
+                text = FileReader.read_text(os.path.join(source, name)).strip()
+                if text:
+                    queries.append({"id": stem, "query": text})
+        else:
+            for i, rec in enumerate(FileReader.read_jsonl(source), start=1):
+                text = str(rec.get("query") or "").strip()
+                if text:
+                    queries.append({"id": str(rec.get("id") or f"q{i:04d}"), "query": text})
+
+        ids = [q["id"] for q in queries]
+        if len(ids) != len(set(ids)):
+            raise ValueError(f"Duplicate query ids in {source}")
+        return queries
+
+    def completed_ids(self) -> Set[str]:
+        """Ids recorded as "ok" in the manifest whose module file still exists."""
+        if not os.path.exists(self.manifest_path):
+            return set()
+        done: Set[str] = set()
+        for rec in FileReader.read_jsonl(self.manifest_path):
+            if rec.get("status") == "ok" and os.path.exists(rec.get("module") or ""):
+                done.add(rec["id"])
+            elif rec.get("id") in done:
+                done.discard(rec["id"])
+        return done
+
+    def run(self, source: str, resume: bool = True, **chat_overrides: Any) -> Dict[str, int]:
+        """
+        Run the batch synchronously (wraps the async implementation).
+
+        Args:
+            source: Query directory or JSONL file.
+            resume: Skip queries already completed in a previous run.
+            **chat_overrides: Payload overrides for every model call (e.g. temperature=0).
+
+        Returns:
+            Counts: {"total", "skipped", "ok", "error"}.
+        """
+        return asyncio.run(self.run_async(source, resume=resume, **chat_overrides))
+
+    async def run_async(self, source: str, resume: bool = True, **chat_overrides: Any) -> Dict[str, int]:
+        """Async variant of run()."""
+        queries = self.load_queries(source)
+        done = self.completed_ids() if resume else set()
+        pending = [q for q in queries if q["id"] not in done]
+        # From the full query list, so a query keeps its file name across resumed runs
+        names = self._module_names([q["id"] for q in queries])
+        stats = {"total": len(queries), "skipped": len(queries) - len(pending), "ok": 0, "error": 0}
+        if not pending:
+            return stats
+
+        # Compile the rules once up front; every build_prompts call then hits the cache
+        self.runner.rules_cache.get_blocks(self.rules_xlsx_path, self.runner.sheet_names, self.runner.mapping_mode)
+
+        queue: "asyncio.Queue[Dict[str, str]]" = asyncio.Queue()
+        for q in pending:
+            queue.put_nowait(q)
+
+        client = self.client or AsyncCopilotClient(max_concurrency=self.max_workers)
+        try:
+            workers = [
+                asyncio.create_task(self._worker(queue, client, names, stats, chat_overrides))
+                for _ in range(min(self.max_workers, len(pending)))
+            ]
+            await asyncio.gather(*workers)
+        finally:
+            if self.client is None:
+                await client.close()
+        return stats
+
+    # -------------------- Internal --------------------
+    async def _worker(
+        self,
+        queue: "asyncio.Queue[Dict[str, str]]",
+        client: AsyncCopilotClient,
+        names: Dict[str, str],
+        stats: Dict[str, int],
+        chat_overrides: Dict[str, Any],
+    ) -> None:
+        while True:
+            try:
+                q = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            t0 = time.perf_counter()
+            record: Dict[str, Any] = {"id": q["id"]}
+            try:
+                # File I/O, prompt assembly and example retrieval: keep them off the event loop
+                system_prompt, user_prompt = await asyncio.to_thread(
+                    self.runner.build_prompts,
+                    rules_xlsx_path=self.rules_xlsx_path,
+                    system_prompt_path=self.system_prompt_path,
+                    user_prompt_path=self.user_prompt_path,
+                    user_query=q["query"],
+                )
+                reply = await client.chat_text(system_prompt, user_prompt, **chat_overrides)
+                module_path = os.path.join(self.modules_dir, f"{names[q['id']]}.js")
+                FileWriter.write_text(self._extract_js(reply), module_path)
+                record.update({"status": "ok", "module": module_path})
+                stats["ok"] += 1
+            except Exception as e:
+                record.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+                stats["error"] += 1
+
+            record["elapsed_s"] = round(time.perf_counter() - t0, 3)
+            record["ts"] = datetime.utcnow().isoformat() + "Z"
+            FileWriter.append_jsonl(record, self.manifest_path)
+
+    @staticmethod
+    def _extract_js(reply: str) -> str:
+        """Return the first ```js/```javascript block (else the first fenced block, else the reply)."""
+        code = CodePatcher.extract_code(reply)
+        return code if code is not None else (reply or "").strip() + "\n"
+
+    @classmethod
+    def _module_names(cls, query_ids: List[str]) -> Dict[str, str]:
+        """
+        File name (without .js) per query id. Ids that sanitize to the same name
+        ("a/b" and "a_b", or differing only in case) get "-2", "-3", ... suffixes.
+        """
+        names: Dict[str, str] = {}
+        taken: Set[str] = set()
+        for query_id in query_ids:
+            base = cls._safe_name(query_id)
+            name, n = base, 2
+            while name.casefold() in taken:
+                name, n = f"{base}-{n}", n + 1
+            taken.add(name.casefold())
+            names[query_id] = name
+        return names
+
+    @staticmethod
+    def _safe_name(query_id: str) -> str:
+        return _UNSAFE_NAME_RE.sub("_", query_id).strip() or "query"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch-generate JS modules from a set of process specifications.")
+    parser.add_argument("queries", help="Directory of *.txt/*.md queries or a JSONL file with {id, query} lines.")
+    parser.add_argument("--out", default="backend/src/outputs/batch", help="Output directory.")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum concurrent model calls.")
+    parser.add_argument("--rules", default="backend/src/rules/AUS_JS_Functions_From_Documentation.xlsx")
+    parser.add_argument("--system", default="backend/src/prompts/system.prompt.code.refinery.txt")
+    parser.add_argument("--user", default="backend/src/prompts/user.prompt.code.refinery.txt")
+    parser.add_argument("--no-resume", action="store_true", help="Regenerate queries already completed.")
+    args = parser.parse_args()
+
+    batch = BatchRunner(
+        rules_xlsx_path=args.rules,
+        system_prompt_path=args.system,
+        user_prompt_path=args.user,
+        output_dir=args.out,
+        max_workers=args.workers,
+    )
+    summary = batch.run(args.queries, resume=not args.no_resume)
+    print(f"[batch] total={summary['total']} skipped={summary['skipped']} ok={summary['ok']} error={summary['error']}")
@@ -0,0 +1,200 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import re
+from typing import List, Optional, Tuple
+
+
+_FENCED_RE = re.compile(r"```[ \t]*([A-Za-z]*)[^\n]*\n(.*?)```", re.DOTALL)
+_EDIT_BLOCK_RE = re.compile(
+    r"^<{5,9} ?SEARCH[ \t]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} ?REPLACE[ \t]*$",
+    re.DOTALL | re.MULTILINE,
+)
+_HUNK_RE = re.compile(r"^@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@.*$", re.MULTILINE)
+# check_balanced: jump from one bracket / comment / string start to the next
+_BALANCE_RE = re.compile(r"//|/\*|['\"`]|[()\[\]{}]")
+_STRING_RE = {
+    "'": re.compile(r"'(?:\\.|[^'\\\n])*'", re.DOTALL),
+    '"': re.compile(r'"(?:\\.|[^"\\\n])*"', re.DOTALL),
+    "`": re.compile(r"`(?:\\.|[^`\\])*`", re.DOTALL),
+}
+
+
+class PatchError(ValueError):
+    """Raised when a reply holds no usable edit or an edit does not apply cleanly."""
+
+
+class CodePatcher:
+    """
+    Apply model-produced edits to the current JS module instead of regenerating it.
+
+    Supported reply formats:
+      - Anchored edit blocks (one or more):
+            <<<<<<< SEARCH
+            exact lines from the current module
+            =======
+            replacement lines
+            >>>>>>> REPLACE
+      - A unified diff (```diff fenced or bare), applied hunk by hunk by matching
+        each hunk's context/removed lines (line numbers are ignored).
+
+    Every SEARCH text must occur exactly once in the module (an exact match is
+    tried first, then one that ignores trailing whitespace). The patched module
+    is validated for balanced brackets before it is accepted.
+
+    Typical usage:
+      try:
+          new_code = CodePatcher.apply(current_code, reply)
+      except PatchError:
+          ...  # ask for the full module instead
+    """
+
+    # Appended to the user's message when a current module exists
+    PATCH_INSTRUCTIONS = (
+        "Do not repeat the whole module. Reply only with edit blocks against the current module, "
+        "one block per change, in this exact format:\n"
+        "<<<<<<< SEARCH\n"
+        "<exact existing lines, enough to be unique>\n"
+        "=======\n"
+        "<replacement lines>\n"
+        ">>>>>>> REPLACE"
+    )
+
+    # -------------------- Public APIs --------------------
+    @staticmethod
+    def extract_code(reply: str) -> Optional[str]:
+        """Return the first ```js/```javascript block (else the first fenced block), or None."""
+        blocks = [(lang, body) for lang, body in _FENCED_RE.findall(reply or "") if lang.lower() != "diff"]
+        for lang, body in blocks:
+            if lang.lower() in ("js", "javascript"):
+                return body.strip() + "\n"
+        if blocks:
+            return blocks[0][1].strip() + "\n"
+        return None
+
+    @classmethod
+    def parse_edits(cls, reply: str) -> List[Tuple[str, str]]:
+        """(search, replace) pairs from edit blocks, or from unified-diff hunks if there are none."""
+        edits = [(s, r) for s, r in _EDIT_BLOCK_RE.findall(reply or "")]
+        if edits:
+            return edits
+        return cls._diff_edits(reply or "")
+
+    @classmethod
+    def apply(cls, code: str, reply: str) -> str:
+        """
+        Apply the edits contained in reply to code.
+
+        Raises:
+            PatchError: no edits found, an edit does not match exactly once, or the
+                result has unbalanced brackets.
+        """
+        edits = cls.parse_edits(reply)
+        if not edits:
+            raise PatchError("reply contains no edit blocks or diff hunks")
+        for search, replace in edits:
+            code = cls._apply_one(code, search, replace)
+        problem = cls.check_balanced(code)
+        if problem:
+            raise PatchError(f"patched module is invalid: {problem}")
+        return code
+
+    @staticmethod
+    def check_balanced(code: str) -> Optional[str]:
+        """
+        Cheap syntax sanity check: (), [], {} balanced outside strings/comments.
+
+        Returns:
+            None if balanced, else a short description of the first problem.
+        """
+        pairs = {")": "(", "]": "[", "}": "{"}
+        stack: List[Tuple[str, int]] = []
+        pos, line = 0, 1
+        while True:
+            m = _BALANCE_RE.search(code, pos)
+            if m is None:
+                break
+            i, token = m.start(), m.group()
+            line += code.count("\n", pos, i)
+            if token == "//":
+                pos = code.find("\n", i)
+                if pos < 0:
+                    break
+            elif token == "/*":
+                end = code.find("*/", i + 2)
+                if end < 0:
+                    return f"unterminated comment at line {line}"
+                line += code.count("\n", i, end)
+                pos = end + 2
+            elif token in _STRING_RE:
+                string = _STRING_RE[token].match(code, i)
+                if string is None:
+                    return f"unterminated string at line {line}"
+                line += code.count("\n", i, string.end())
+                pos = string.end()
+            else:
+                if token in "([{":
+                    stack.append((token, line))
+                elif not stack or stack[-1][0] != pairs[token]:
+                    return f"unexpected '{token}' at line {line}"
+                else:
+                    stack.pop()
+                pos = i + 1
+        if stack:
+            return f"unclosed '{stack[-1][0]}' from line {stack[-1][1]}"
+        return None
+
+    # ------------------------------ helpers ------------------------------
+    @staticmethod
+    def _apply_one(code: str, search: str, replace: str) -> str:
+        if not search.strip():
+            raise PatchError("empty SEARCH text")
+        count = code.count(search)
+        if count == 1:
+            return code.replace(search, replace, 1)
+        if count > 1:
+            raise PatchError(f"SEARCH text is ambiguous ({count} matches): {search.strip()[:60]!r}")
+
+        # Retry ignoring trailing whitespace on every line
+        lines = code.split("\n")
+        stripped = [l.rstrip() for l in lines]
+        target = [l.rstrip() for l in search.rstrip("\n").split("\n")]
+        hits = [i for i in range(len(lines) - len(target) + 1) if stripped[i:i + len(target)] == target]
+        if len(hits) != 1:
+            what = "not found" if not hits else f"ambiguous ({len(hits)} matches)"
+            raise PatchError(f"SEARCH text {what}: {search.strip()[:60]!r}")
+        i = hits[0]
+        new = replace.rstrip("\n").split("\n") if replace.strip() else []
+        return "\n".join(lines[:i] + new + lines[i + len(target):])
+
+    @staticmethod
+    def _diff_edits(reply: str) -> List[Tuple[str, str]]:
+        """Turn unified-diff hunks into (old, new) text pairs."""
+        fenced = [body for lang, body in _FENCED_RE.findall(reply) if lang.lower() in ("diff", "patch")]
+        text = fenced[0] if fenced else reply
+        starts = [m.end() for m in _HUNK_RE.finditer(text)]
+        ends = [m.start() for m in _HUNK_RE.finditer(text)][1:] + [len(text)]
+        edits: List[Tuple[str, str]] = []
+        for s, e in zip(starts, ends):
+            old: List[str] = []
+            new: List[str] = []
+            for line in text[s:e].split("\n")[1:]:
+                if line.startswith(("--- ", "+++ ")):
+                    break  # next file header
+                if line.startswith("-"):
+                    old.append(line[1:])
+                elif line.startswith("+"):
+                    new.append(line[1:])
+                elif line.startswith(" ") or line == "":
+                    old.append(line[1:])
+                    new.append(line[1:])
+                elif line.startswith("\\"):
+                    continue  # "\ No newline at end of file"
+            # Trailing blank lines are usually separators, not context
+            while old and new and old[-1] == "" and new[-1] == "":
+                old.pop()
+                new.pop()
+            if old:
+                edits.append(("\n".join(old) + "\n", "\n".join(new) + ("\n" if new else "")))
+        return edits
@@ -0,0 +1,211 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import re
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from backend.src.rule_compiler.rules_compiler import RulesCompiler
+from backend.src.rule_compiler.rules_cache import RulesCache
+from backend.src.rule_compiler.path_trie import PathTrie
+from backend.src.library.js_scanner import JsScanner
+from backend.src.query.code_patch import CodePatcher
+
+
+_FUNC_NAME_RE = re.compile(r"([A-Za-z_$][\w$]*)\s*\(")
+_DECLARE_CLASS_RE = re.compile(r"\bclass\s+([A-Za-z_$][\w$]*)")
+# Members start a line or follow "{" / ";" (one-line declarations: "declare class Log { static warning(...); }")
+_STATIC_METHOD_RE = re.compile(r"(?:^|[{;])\s*(?:static\s+)?([A-Za-z_$][\w$]*)\s*\(", re.MULTILINE)
+_LOCAL_DECL_RE = re.compile(r"\b(?:const|let|var|class|function)\s+([A-Z][\w$]*)")
+
+
+class CodeValidator:
+    """
+    Fast static check of generated JS against the rules workbook.
+
+    Built once per workbook from the RulesCompiler items:
+      - API index: object -> known methods, from the Documentation sections
+        ("Simulator class of functions" -> getData, setData, ...) and the
+        TypeDefinitions declarations ("declare class X { static m(...) }");
+      - path index: PathTrie over the AUS mapping paths, placeholders ("<UnitName>")
+        collapsed into one wildcard segment so lookups stay linear in the path length.
+
+    validate() scans the code with JsScanner and reports:
+      - "syntax": unbalanced brackets / unterminated strings or comments,
+      - "api":    calls on an unknown AUS object, unknown methods, unknown classes
+                  in `new X(...)`,
+      - "path":   string / template paths that match no mapping pattern (segments
+                  computed at run time, e.g. `Streams.${name}.Volume`, match anything).
+    Objects and classes declared in the module itself are not reported.
+
+    Typical usage:
+      validator = CodeValidator.for_workbook(xlsx_path)
+      findings = validator.validate(reply)      # [] when clean
+      print(CodeValidator.format_findings(findings))
+    """
+
+    _memo: Dict[str, "CodeValidator"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, items: List[Dict[str, Any]]) -> None:
+        """
+        Args:
+            items: Rule items as returned by RulesCompiler.extract_all_items.
+        """
+        self.methods: Dict[str, Set[str]] = {}
+        self.classes: Dict[str, str] = {}  # lower-case name -> declared spelling
+        generic: Set[str] = set()
+        paths: List[str] = []
+
+        for item in items:
+            if item["kind"] == "function":
+                m = _FUNC_NAME_RE.search(item.get("name") or "")
+                if not m:
+                    continue
+                owner = self._section_owner(item.get("group") or "")
+                if owner:
+                    self.methods.setdefault(owner, set()).add(m.group(1))
+                    self.classes.setdefault(owner, owner)
+                else:
+                    generic.add(m.group(1))
+            elif item["kind"] == "type":
+                text = item.get("text") or ""
+                m = _DECLARE_CLASS_RE.search(text)
+                if m:
+                    name = m.group(1)
+                    self.classes[name.lower()] = name
+                    self.methods.setdefault(name.lower(), set()).update(_STATIC_METHOD_RE.findall(text[m.end():]))
+            elif item["kind"] == "path":
+                # One canonical placeholder per position: "<TankName>" / "<Tank2>" siblings merge,
+                # so a lookup follows at most one placeholder branch per segment
+                paths.append(".".join(
+                    JsScanner.DYNAMIC if PathTrie.is_placeholder(seg) else seg for seg in item["name"].split(".")
+                ))
+
+        # Functions documented outside any class section are accepted on every known object
+        for known in self.methods.values():
+            known.update(generic)
+        self.paths = PathTrie.from_paths(paths)
+
+    # -------------------- Construction --------------------
+    @classmethod
+    def for_workbook(
+        cls,
+        xlsx_path: str,
+        sheet_names: Optional[Dict[str, str]] = None,
+        rules_cache: Optional[RulesCache] = None,
+    ) -> "CodeValidator":
+        """
+        Return the (process-wide memoized) validator for a rules workbook. Items come
+        from RulesCache (shared with RuleIndex), so it is rebuilt only when the workbook changes.
+        """
+        cache = rules_cache or RulesCache()
+        key = cache.make_key("items", xlsx_path, sheet_names)
+        with cls._lock:
+            if key in cls._memo:
+                return cls._memo[key]
+
+        items = cache.get_or_build(
+            "items",
+            xlsx_path,
+            sheet_names,
+            lambda: RulesCompiler(xlsx_path).extract_all_items(sheet_names),
+        )
+        validator = cls(items)
+        with cls._lock:
+            cls._memo[key] = validator
+        return validator
+
+    # -------------------- Public APIs --------------------
+    def validate(self, reply: str) -> List[Dict[str, Any]]:
+        """
+        Check the JS module in a reply (the first fenced block, else the whole text).
+
+        Returns:
+            Findings in source order, each {"kind", "item", "line", "message"}; [] when clean.
+        """
+        code = CodePatcher.extract_code(reply) or reply or ""
+        findings: List[Dict[str, Any]] = []
+
+        problem = CodePatcher.check_balanced(code)
+        if problem:
+            findings.append({"kind": "syntax", "item": "", "line": self._line_of(problem), "message": problem})
+
+        found = JsScanner.scan_with_lines(code)
+        local = set(_LOCAL_DECL_RE.findall(code))
+        seen: Set[str] = set()
+
+        if self.methods:
+            for call, line in found["api_calls"]:
+                if call in seen:
+                    continue
+                seen.add(call)
+                message = self._check_call(call, local)
+                if message:
+                    findings.append({"kind": "api", "item": call, "line": line, "message": message})
+
+        if len(self.paths):
+            for path, line in found["paths"]:
+                if path in seen:
+                    continue
+                seen.add(path)
+                if self._match_path(path) is None:
+                    findings.append({
+                        "kind": "path", "item": path, "line": line,
+                        "message": f"path not in the variable mapping: {path}",
+                    })
+
+        findings.sort(key=lambda f: f["line"])
+        return findings
+
+    @staticmethod
+    def format_findings(findings: List[Dict[str, Any]]) -> str:
+        """One bullet per finding, e.g. "- line 12 [path] path not in the variable mapping: ..."."""
+        return "\n".join(f"- line {f['line']} [{f['kind']}] {f['message']}" for f in findings)
+
+    # ------------------------------ helpers ------------------------------
+    def _check_call(self, call: str, local: Set[str]) -> Optional[str]:
+        if call.startswith("new "):
+            name = call[4:]
+            if name in local or name.lower() in self.classes:
+                return None
+            return f"unknown class: new {name}(...)"
+        owner, method = call.split(".", 1)
+        if owner in local:
+            return None
+        known = self.methods.get(owner.lower())
+        if known is None:
+            return f"unknown API object: {owner}"
+        if method not in known:
+            return f"unknown method {owner}.{method} (known: {', '.join(sorted(known))})"
+        return None
+
+    def _match_path(self, path: str) -> Optional[str]:
+        # Partly computed segments ("${unit}-Feed") are as unknown as fully computed ones
+        segs = [JsScanner.DYNAMIC if JsScanner.DYNAMIC in seg else seg for seg in path.split(".")]
+        return self.paths.match(".".join(segs), allow_prefix=True, wildcard=JsScanner.DYNAMIC)
+
+    @staticmethod
+    def _section_owner(group: str) -> Optional[str]:
+        """'Simulator Class Of Functions' -> 'simulator'; 'General' / 'Misc Helpers' (no "class") -> None."""
+        words = group.split()
+        if len(words) < 2 or "class" not in (w.lower() for w in words[1:]):
+            return None
+        return words[0].lower()
+
+    @staticmethod
+    def _line_of(problem: str) -> int:
+        m = re.search(r"line (\d+)", problem)
+        return int(m.group(1)) if m else 1
+
+
+if __name__ == "__main__":
+    sample_path = "backend/src/rules/AUS_JS_Functions_From_Documentation.xlsx"
+    code = (
+        "const v = Simulator.getData(`Streams.${name}.Volume`);\n"
+        'Simulator.setData({"Units.FCCU.Parameters.Intake": v});\n'
+        "Simulator.getDat('Pipes.X.Flow');\n"
+    )
+    validator = CodeValidator.for_workbook(sample_path)
+    print(CodeValidator.format_findings(validator.validate(code)) or "clean")
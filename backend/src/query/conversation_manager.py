@@ -3,11 +3,18 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 import json
-from typing import List, Dict, Optional, Any
+import threading
+from typing import Iterator, List, Dict, Optional, Any, Tuple
 from datetime import datetime
 
+from backend.src.data_io.file_reader import FileReader
 from backend.src.query.user_query_runner import UserQueryRunner
 from backend.src.llm.copilot_client import CopilotClient
+from backend.src.llm.token_estimator import TokenEstimator
+from backend.src.query.session_store import JsonlSessionStore, SessionStore
+from backend.src.query.code_patch import CodePatcher, PatchError
+from backend.src.query.artifact_store import ArtifactStore
+from backend.src.query.code_validator import CodeValidator
 
 
 class ConversationManager:
@@ -16,10 +23,22 @@ class ConversationManager:
 
     Responsibilities:
       - Keep OpenAI-style `messages` (system/user/assistant) in memory
-      - Persist/restore to/from disk (JSON + JSONL)
+      - Persist/restore via an append-only session store (snapshot + op log), plus a JSONL audit log
       - Start a session with (system, user) prompts (first turn)
       - Continue the session with user feedback (subsequent turns)
-      - Token-safe trimming by last-N turns (optional rolling summary hook)
+      - Optionally stream replies token-by-token (start_with_stream / continue_with_stream)
+      - Token-budget trimming: system prompt + as many recent messages as fit,
+        leaving room for the reply (optional last-N-turns cap)
+      - Optional rolling summary: turns about to fall out of the budget are folded
+        into one compact assistant message, in a background thread after the reply
+      - Code artifacts: fenced code in replies is kept in a content-addressed ArtifactStore
+        and history holds references; requests expand only the latest module in full,
+        superseded versions are sent as one-line stubs
+      - Optional patch mode: follow-up turns ask for edit blocks against the current
+        JS module, apply them locally and record the full updated module
+      - Optional repair mode: every reply carrying code is checked by a CodeValidator;
+        on findings a follow-up with only the findings list is sent automatically
+        (at most max_repair_rounds per turn), with per-session repair statistics
 
     Typical usage:
       cm = ConversationManager(session_id="demo")
@@ -27,55 +46,150 @@ class ConversationManager:
       next_reply = cm.continue_with("Please cap output to 1000 m3/h")
     """
 
+    # Marks the assistant message holding the rolling summary of evicted turns
+    SUMMARY_PREFIX = "[Summary of earlier conversation]"
+    # Summarize once history exceeds this share of the budget, down to the target share
+    SUMMARY_TRIGGER_RATIO = 0.8
+    SUMMARY_TARGET_RATIO = 0.5
+    SUMMARY_MAX_TOKENS = 600
+    # Evicted messages are clipped to this many characters before summarization
+    SUMMARY_SOURCE_CHARS = 4000
+    SUMMARY_INSTRUCTIONS = (
+        "You maintain a running summary of a conversation in which a user refines generated "
+        "JavaScript for a refinery simulation. Merge the previous summary with the new messages. "
+        "Keep every user requirement, constraint, numeric limit, unit/stream/parameter name and "
+        "decision that is still in force, and drop anything superseded. Answer with concise "
+        "bullet points only, no code."
+    )
+    # Marks the automatic follow-up sent when validation finds problems
+    REPAIR_PREFIX = "[Automatic validation]"
+    REPAIR_INSTRUCTIONS = (
+        "Correct the module so that these problems are gone. Use only APIs and variable paths "
+        "from the knowledge parts, and keep everything else unchanged."
+    )
+
     def __init__(
         self,
         session_id: str,
         storage_dir: str = "backend/src/outputs/sessions",
         copilot: Optional[CopilotClient] = None,
-        max_turns: int = 20,
+        max_turns: Optional[int] = None,
+        context_tokens: int = 32000,
         enable_rolling_summary: bool = False,
+        store: Optional[SessionStore] = None,
+        patch_mode: bool = False,
+        artifact_store: Optional[ArtifactStore] = None,
+        validator: Optional[CodeValidator] = None,
+        max_repair_rounds: int = 2,
     ) -> None:
         """
         Args:
             session_id: Identifier for the conversation (used for persistence).
             storage_dir: Directory to store session history files.
             copilot: Optional CopilotClient; if None, a default instance will be created.
-            max_turns: Keep only the last N turns (user+assistant pairs) plus the system message.
-            enable_rolling_summary: If True, you may implement a summary routine to compress history.
+            max_turns: Optional hard cap: keep at most the last N turns (user+assistant pairs)
+                plus the system message.
+            context_tokens: Token budget of the prompt plus the reply; history is trimmed so that
+                messages + max_tokens (the reply reservation) fit into it.
+            enable_rolling_summary: If True, turns that would be trimmed are first folded into a
+                rolling summary message (computed in a background thread after each reply).
+            store: Optional session store (e.g. a shared SqliteSessionStore); defaults to a
+                JsonlSessionStore in storage_dir.
+            patch_mode: If True, follow-ups are answered with edit blocks (SEARCH/REPLACE or a
+                unified diff) that are applied locally; a patch that does not apply falls back
+                to regenerating the full module.
+            artifact_store: Optional ArtifactStore for code blocks in replies; defaults to
+                one under storage_dir/artifacts.
+            validator: Optional CodeValidator (e.g. CodeValidator.for_workbook(xlsx_path));
+                enables repair mode.
+            max_repair_rounds: Maximum automatic repair follow-ups per user turn in repair mode.
         """
         self.session_id = session_id
         self.storage_dir = storage_dir
         os.makedirs(storage_dir, exist_ok=True)
 
-        self._path_json = os.path.join(storage_dir, f"{session_id}.json")
         self._path_jsonl = os.path.join(storage_dir, f"{session_id}.jsonl")
 
+        self.store = store or JsonlSessionStore(storage_dir)
         self.copilot = copilot or CopilotClient()
         self.messages: List[Dict[str, str]] = []
-        self.max_turns = int(max_turns)
+        self.max_turns = int(max_turns) if max_turns is not None else None
+        self.context_tokens = int(context_tokens)
+        # Running token total of self.messages (kept in sync by _append/_replace/_drop)
+        self._history_tokens = 0
+        # (index, code, tokens) of the newest assistant message with code (see _latest_artifact)
+        self._artifact: Optional[Tuple[int, str, int]] = None
+        self._lock = threading.RLock()
+        self._summary_thread: Optional[threading.Thread] = None
         self.enable_rolling_summary = bool(enable_rolling_summary)
+        self.patch_mode = bool(patch_mode)
+        self.artifacts = artifact_store or ArtifactStore(os.path.join(storage_dir, "artifacts"))
+        self.validator = validator
+        self.max_repair_rounds = int(max_repair_rounds)
+        # Repair-mode counters for this session (see _finish_repair), restored on load
+        self.repair_stats: Dict[str, int] = {
+            "turns": 0,
+            "first_try_clean": 0,
+            "repaired": 0,
+            "unresolved": 0,
+            "repair_rounds": 0,
+            "repair_prompt_tokens": 0,
+            "repair_completion_tokens": 0,
+        }
+        self._last_usage: Optional[Dict[str, Any]] = None
 
         self._load_if_exists()
 
     # -------------------- Persistence --------------------
     def _load_if_exists(self) -> None:
-        """Load existing messages from disk if a session file exists."""
-        if os.path.exists(self._path_json):
-            with open(self._path_json, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            self.messages = data.get("messages", [])
-        else:
-            self.messages = []
-
-    def _save(self) -> None:
-        """Persist current messages to a JSON file."""
-        payload = {
-            "session_id": self.session_id,
-            "updated_at": datetime.utcnow().isoformat() + "Z",
-            "messages": self.messages,
-        }
-        with open(self._path_json, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
+        """
+        Load existing messages from the session store (empty if the session is new) and
+        rebuild repair_stats from the "repair" events of the session log.
+        """
+        self.messages = self.store.load(self.session_id)
+        self._history_tokens = TokenEstimator.count_messages(self.messages)
+        self._artifact = self._scan_artifact()
+        if os.path.exists(self._path_jsonl):
+            for event in FileReader.read_jsonl(self._path_jsonl):
+                if event.get("event") == "repair" and event.get("outcome") in self.repair_stats:
+                    self._count_repair(
+                        event["outcome"],
+                        int(event.get("rounds") or 0),
+                        int(event.get("prompt_tokens") or 0),
+                        int(event.get("completion_tokens") or 0),
+                    )
+
+    def _append(self, message: Dict[str, str]) -> None:
+        """Append one message in memory and persist only that message."""
+        with self._lock:
+            self.messages.append(message)
+            self._history_tokens += TokenEstimator.count_message(message)
+            code = self._artifact_code(message)
+            if code is not None:
+                self._artifact = (len(self.messages) - 1, code, TokenEstimator.count(code))
+            self.store.append(self.session_id, message)
+
+    def _replace(self, messages: List[Dict[str, str]]) -> None:
+        """Replace the whole history (new conversation / reset / summary) and persist it."""
+        with self._lock:
+            self.messages = list(messages)
+            self._history_tokens = TokenEstimator.count_messages(self.messages)
+            self._artifact = self._scan_artifact()
+            self.store.replace(self.session_id, self.messages)
+
+    def _drop(self, start: int, count: int) -> None:
+        """Remove messages[start:start + count] in memory and in the store."""
+        with self._lock:
+            for m in self.messages[start:start + count]:
+                self._history_tokens -= TokenEstimator.count_message(m)
+            del self.messages[start:start + count]
+            if self._artifact is not None and self._artifact[0] >= start:
+                if self._artifact[0] >= start + count:
+                    index, code, tokens = self._artifact
+                    self._artifact = (index - count, code, tokens)
+                else:
+                    self._artifact = self._scan_artifact()
+            self.store.drop(self.session_id, start, count)
 
     def _append_jsonl(self, obj: Dict[str, Any]) -> None:
         """Append a small event record to JSONL (for debugging/auditing)."""
@@ -85,8 +199,7 @@ class ConversationManager:
     # -------------------- Public APIs --------------------
     def reset(self) -> None:
         """Clear messages and persist a fresh session state."""
-        self.messages = []
-        self._save()
+        self._replace([])
 
     def start_with(self, system_prompt: str, user_prompt: str, **overrides: Any) -> str:
         """
@@ -96,11 +209,11 @@ class ConversationManager:
         Returns:
             Assistant reply text.
         """
-        self.messages = [
+        self._replace([
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
-        ]
-        assistant_text = self._call_and_record(**overrides)
+        ])
+        assistant_text = self._call_and_repair(**overrides)
         return assistant_text
 
     def continue_with(self, user_message: str, **overrides: Any) -> str:
@@ -111,64 +224,473 @@ class ConversationManager:
         Returns:
             Assistant reply text.
         """
-        self.messages.append({"role": "user", "content": user_message})
-        assistant_text = self._call_and_record(**overrides)
+        self._append({"role": "user", "content": user_message})
+        assistant_text = self._call_and_repair(**overrides)
         return assistant_text
 
+    def start_with_stream(self, system_prompt: str, user_prompt: str, **overrides: Any) -> Iterator[str]:
+        """
+        Streaming variant of start_with: yields reply fragments as they arrive and
+        records/persists the full assistant message once the stream completes.
+        """
+        self._replace([
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ])
+        yield from self._stream_and_repair(**overrides)
+
+    def continue_with_stream(self, user_message: str, **overrides: Any) -> Iterator[str]:
+        """
+        Streaming variant of continue_with: yields reply fragments as they arrive and
+        records/persists the full assistant message once the stream completes.
+        """
+        self._append({"role": "user", "content": user_message})
+        yield from self._stream_and_repair(**overrides)
+
     def add_user(self, content: str) -> None:
         """Append a user message without sending (advanced/manual control)."""
-        self.messages.append({"role": "user", "content": content})
-        self._save()
+        self._append({"role": "user", "content": content})
 
     def add_assistant(self, content: str) -> None:
         """Append an assistant message without sending (advanced/manual control)."""
-        self.messages.append({"role": "assistant", "content": content})
-        self._save()
+        self._append({"role": "assistant", "content": self.artifacts.dehydrate(content)})
 
     def history(self) -> List[Dict[str, str]]:
-        """Return a shallow copy of current messages history."""
-        return list(self.messages)
+        """Return a copy of the messages history with every code artifact expanded."""
+        return [{**m, "content": self.artifacts.hydrate(m["content"])} for m in self.messages]
 
     # -------------------- Internal --------------------
     def _call_and_record(self, **overrides: Any) -> str:
         """
         Call Copilot with current messages, append assistant reply, persist files,
-        and return assistant text.
+        and return assistant text. If the call fails, the request message is
+        removed again so no unanswered message stays in the history.
         """
-        self._maybe_trim()
+        request = self.messages[-1] if self.messages else None
+        try:
+            self._maybe_trim(overrides.get("max_tokens"))
+            artifact = self._latest_artifact() if self.patch_mode else None
+
+            data = self.copilot.chat_raw(self._outgoing(patch=bool(artifact)), **overrides)
+            assistant_text = self._reply_text(data)
+            usage = data.get("usage") if isinstance(data, dict) else None
+            self._last_usage = usage
+
+            if artifact:
+                new_code = self._try_patch(artifact, assistant_text)
+                if new_code is None:
+                    # Full regeneration: plain request without the edit-block instructions
+                    data = self.copilot.chat_raw(self._outgoing(), **overrides)
+                    assistant_text = self._reply_text(data)
+                    discarded, usage = usage, data.get("usage") if isinstance(data, dict) else None
+                    # The discarded patch attempt was paid for too
+                    self._last_usage = self._sum_usage(discarded, usage)
+                else:
+                    assistant_text = f"```javascript\n{new_code}```"
+        except BaseException:
+            self._discard_unanswered(request)
+            raise
+
+        self._record_reply(assistant_text, max_tokens=overrides.get("max_tokens"), usage=usage)
+        return assistant_text
 
-        data = self.copilot.chat_raw(self.messages, **overrides)
+    def _stream_and_record(self, **overrides: Any) -> Iterator[str]:
+        """
+        Stream the reply for the current messages, then append and persist it.
+        If the stream fails or is abandoned midway, no reply is recorded and the
+        request message is removed again.
+        In patch mode the edit blocks are streamed, followed by the full updated module
+        (or by a streamed full regeneration if the edits do not apply).
+        """
+        request = self.messages[-1] if self.messages else None
         try:
-            assistant_text = data["choices"][0]["message"]["content"]
-        except Exception:
-            # Fallback: dump raw json for debugging
-            assistant_text = str(data)
+            self._maybe_trim(overrides.get("max_tokens"))
+            artifact = self._latest_artifact() if self.patch_mode else None
+
+            self._last_usage = None
+            parts: List[str] = []
+            for delta in self.copilot.chat_stream(self._outgoing(patch=bool(artifact)), **overrides):
+                parts.append(delta)
+                yield delta
+            assistant_text = "".join(parts)
+
+            if artifact:
+                new_code = self._try_patch(artifact, assistant_text)
+                if new_code is None:
+                    yield "\n\n_The edits could not be applied; regenerating the full module._\n\n"
+                    parts = []
+                    for delta in self.copilot.chat_stream(self._outgoing(), **overrides):
+                        parts.append(delta)
+                        yield delta
+                    assistant_text = "".join(parts)
+                else:
+                    assistant_text = f"```javascript\n{new_code}```"
+                    yield f"\n\nUpdated module:\n\n{assistant_text}"
+        except BaseException:
+            # Also reached on GeneratorExit when the caller stops iterating
+            self._discard_unanswered(request)
+            raise
+
+        self._record_reply(assistant_text, stream=True, max_tokens=overrides.get("max_tokens"))
+
+    def _discard_unanswered(self, request: Optional[Dict[str, str]]) -> None:
+        """Drop the request message again if it is still the last one (its call did not complete)."""
+        with self._lock:
+            if request is not None and self.messages and self.messages[-1] is request:
+                self._drop(len(self.messages) - 1, 1)
+
+    def _record_reply(
+        self,
+        assistant_text: str,
+        stream: bool = False,
+        max_tokens: Optional[int] = None,
+        usage: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Append the assistant reply (code blocks stored as artifact references),
+        persist the session and log the exchange; then, if enabled, start the
+        rolling summary in the background.
 
-        self.messages.append({"role": "assistant", "content": assistant_text})
-        self._save()
+        The log records the system prompt's prefix fingerprint and, when the API
+        reports it, the number of prompt tokens served from the provider cache.
+        """
+        system = self.messages[0]["content"] if self.messages and self.messages[0]["role"] == "system" else ""
+        cached = ((usage or {}).get("prompt_tokens_details") or {}).get("cached_tokens")
+        self._append({"role": "assistant", "content": self.artifacts.dehydrate(assistant_text)})
         self._append_jsonl({
             "ts": datetime.utcnow().isoformat() + "Z",
             "session_id": self.session_id,
             "event": "exchange",
+            "stream": stream,
             "messages_len": len(self.messages),
+            "prefix_fingerprint": UserQueryRunner.prefix_fingerprint(system),
+            "prompt_tokens": (usage or {}).get("prompt_tokens"),
+            "cached_tokens": cached,
         })
+        if self.enable_rolling_summary:
+            self._schedule_summary(max_tokens)
+
+    def _maybe_trim(self, max_tokens: Optional[int] = None) -> None:
+        """
+        Drop the oldest non-system messages until the history plus the reply
+        reservation (max_tokens, else the client's default) fits context_tokens,
+        and, if max_turns is set, until at most max_turns pairs remain.
+        The newest message is always kept. Per-message counts are memoized, and the
+        running total and the latest artifact are maintained incrementally, so a turn
+        that needs no trimming costs O(1) and a trim costs O(dropped messages).
+        The rolling summary message (if any) is kept with the system prompt; a
+        summary still being computed is waited for first. The latest code artifact,
+        which is expanded in full when sending, is charged against the budget.
+        """
+        self.wait_for_summary()
+
+        if not self.messages:
+            return
+        start = self._head_len()
+        budget = self._budget(max_tokens)
+        if self._artifact is not None:
+            budget -= self._artifact[2]
+
+        count = 0
+        if self.max_turns is not None:
+            count = max(0, len(self.messages) - start - 2 * self.max_turns)
+        excess = self._history_tokens - budget
+        for m in self.messages[start:start + count]:
+            excess -= TokenEstimator.count_message(m)
+        for m in self.messages[start + count:-1]:
+            if excess <= 0:
+                break
+            excess -= TokenEstimator.count_message(m)
+            count += 1
+        # Do not leave an assistant reply without the user message it answered
+        while start + count < len(self.messages) - 1 and self.messages[start + count]["role"] == "assistant":
+            count += 1
+        if count:
+            self._drop(start, count)
+
+    def _outgoing(self, patch: bool = False) -> List[Dict[str, str]]:
+        """
+        Messages as sent to the model: the code of the newest reply carrying code is
+        expanded in full, older versions become stubs. With patch=True the edit-block
+        instructions are appended to the last user message (never stored).
+        """
+        keep: set = set()
+        for m in reversed(self.messages):
+            refs = ArtifactStore.refs(m["content"]) if m["role"] == "assistant" else []
+            if refs:
+                keep = set(refs)
+                break
+        out = [{"role": m["role"], "content": self.artifacts.hydrate(m["content"], keep)} for m in self.messages]
+        if patch and out:
+            out[-1] = {"role": out[-1]["role"], "content": f"{out[-1]['content']}\n\n{CodePatcher.PATCH_INSTRUCTIONS}"}
+        return out
+
+    @staticmethod
+    def _reply_text(data: Dict[str, Any]) -> str:
+        try:
+            return data["choices"][0]["message"]["content"]
+        except Exception:
+            # Fallback: dump raw json for debugging
+            return str(data)
+
+    # -------------------- Repair mode --------------------
+    def _call_and_repair(self, **overrides: Any) -> str:
+        """
+        _call_and_record, then (in repair mode) validate the reply and send repair
+        follow-ups until it is clean or max_repair_rounds is reached.
+        """
+        assistant_text = self._call_and_record(**overrides)
+        if self.validator is None:
+            return assistant_text
+        findings = self._validate_reply(0)
+        if findings is None:
+            return assistant_text
+        rounds, cost = 0, [0, 0]
+        while findings and rounds < self.max_repair_rounds:
+            rounds += 1
+            prompt_tokens = self._send_repair(findings)
+            assistant_text = self._call_and_record(**overrides)
+            self._add_cost(cost, prompt_tokens, assistant_text)
+            checked = self._validate_reply(rounds)
+            # A repair reply without code fixes nothing
+            findings = findings if checked is None else checked
+        self._finish_repair(rounds, findings, cost)
         return assistant_text
 
-    def _maybe_trim(self) -> None:
+    def _stream_and_repair(self, **overrides: Any) -> Iterator[str]:
+        """Streaming variant of _call_and_repair; repair replies are streamed after a short note."""
+        yield from self._stream_and_record(**overrides)
+        if self.validator is None:
+            return
+        findings = self._validate_reply(0)
+        if findings is None:
+            return
+        rounds, cost = 0, [0, 0]
+        while findings and rounds < self.max_repair_rounds:
+            rounds += 1
+            yield f"\n\n_Validation found {len(findings)} problem(s); requesting a fix._\n\n"
+            prompt_tokens = self._send_repair(findings)
+            yield from self._stream_and_record(**overrides)
+            self._add_cost(cost, prompt_tokens, self._last_reply())
+            checked = self._validate_reply(rounds)
+            # A repair reply without code fixes nothing
+            findings = findings if checked is None else checked
+        self._finish_repair(rounds, findings, cost)
+
+    def _validate_reply(self, round_no: int) -> Optional[List[Dict[str, Any]]]:
+        """Findings for the code in the last reply, or None if the reply carries no code."""
+        reply = self._last_reply()
+        if CodePatcher.extract_code(reply) is None:
+            return None
+        findings = self.validator.validate(reply)
+        self._append_jsonl({
+            "ts": datetime.utcnow().isoformat() + "Z",
+            "session_id": self.session_id,
+            "event": "validation",
+            "round": round_no,
+            "findings": findings,
+        })
+        return findings
+
+    def _send_repair(self, findings: List[Dict[str, Any]]) -> int:
+        """Append the repair follow-up; returns the (estimated) prompt tokens of the repair call."""
+        self._append({
+            "role": "user",
+            "content": f"{self.REPAIR_PREFIX}\n{CodeValidator.format_findings(findings)}\n\n{self.REPAIR_INSTRUCTIONS}",
+        })
+        return TokenEstimator.count_messages(self._outgoing())
+
+    def _add_cost(self, cost: List[int], estimated_prompt: int, reply: str) -> None:
+        """Accumulate [prompt, completion] tokens of one repair call (API usage when reported)."""
+        usage = self._last_usage or {}
+        cost[0] += int(usage.get("prompt_tokens") or estimated_prompt)
+        cost[1] += int(usage.get("completion_tokens") or TokenEstimator.count(reply))
+
+    def _finish_repair(self, rounds: int, findings: List[Dict[str, Any]], cost: List[int]) -> None:
+        """Update repair_stats for one user turn and log its outcome and cost."""
+        outcome = "first_try_clean" if not rounds and not findings else ("unresolved" if findings else "repaired")
+        self._count_repair(outcome, rounds, cost[0], cost[1])
+        self._append_jsonl({
+            "ts": datetime.utcnow().isoformat() + "Z",
+            "session_id": self.session_id,
+            "event": "repair",
+            "outcome": outcome,
+            "rounds": rounds,
+            "remaining_findings": len(findings),
+            "prompt_tokens": cost[0],
+            "completion_tokens": cost[1],
+            "stats": dict(self.repair_stats),
+        })
+
+    def _count_repair(self, outcome: str, rounds: int, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            stats = self.repair_stats
+            stats["turns"] += 1
+            stats[outcome] += 1
+            stats["repair_rounds"] += rounds
+            stats["repair_prompt_tokens"] += prompt_tokens
+            stats["repair_completion_tokens"] += completion_tokens
+
+    @staticmethod
+    def _sum_usage(*usages: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Prompt / completion tokens of several calls added up (None if none reported usage)."""
+        reported = [u for u in usages if u]
+        if not reported:
+            return None
+        return {
+            key: sum(int(u.get(key) or 0) for u in reported)
+            for key in ("prompt_tokens", "completion_tokens", "total_tokens")
+        }
+
+    def _last_reply(self) -> str:
+        """Content of the last message with code artifacts expanded."""
+        return self.artifacts.hydrate(self.messages[-1]["content"]) if self.messages else ""
+
+    # -------------------- Patch mode --------------------
+    def _latest_artifact(self) -> Optional[Tuple[int, str]]:
+        """(index, code) of the newest assistant message carrying a code block, if any."""
+        with self._lock:
+            return self._artifact[:2] if self._artifact is not None else None
+
+    def _scan_artifact(self) -> Optional[Tuple[int, str, int]]:
+        """Find the latest artifact by walking the history backwards (after load / replace)."""
+        for i in range(len(self.messages) - 1, -1, -1):
+            code = self._artifact_code(self.messages[i])
+            if code is not None:
+                return i, code, TokenEstimator.count(code)
+        return None
+
+    def _artifact_code(self, message: Dict[str, str]) -> Optional[str]:
+        """Code of an assistant message (not the rolling summary), or None."""
+        if message["role"] != "assistant" or self._is_summary(message):
+            return None
+        return CodePatcher.extract_code(self.artifacts.hydrate(message.get("content") or ""))
+
+    def _try_patch(self, artifact: Tuple[int, str], reply: str) -> Optional[str]:
         """
-        Keep only system + last (max_turns) user/assistant pairs to avoid token overflow.
-        If enable_rolling_summary is True, you can implement a summary of old turns here.
+        Apply the reply's edits to the current module. A reply that ignored the
+        instructions and re-sent a whole module is accepted as is.
+
+        Returns:
+            The updated module, or None if a full regeneration is needed.
         """
-        if self.enable_rolling_summary:
-            # TODO: Optionally call the model to summarize older turns,
-            # then replace old messages with a short "assistant" summary message.
-            pass
-
-        # Keep: system message + last (max_turns*2) messages (user+assistant pairs)
-        if len(self.messages) > (2 * self.max_turns + 1):
-            sys_msg = self.messages[0] if self.messages and self.messages[0]["role"] == "system" else None
-            tail = self.messages[-(2 * self.max_turns):]
-            self.messages = [sys_msg] + tail if sys_msg else tail
+        status, detail, new_code = "applied", "", None
+        try:
+            new_code = CodePatcher.apply(artifact[1], reply)
+        except PatchError as e:
+            full = CodePatcher.extract_code(reply)
+            if full is not None and not CodePatcher.parse_edits(reply):
+                status, new_code = "full_reply", full
+            else:
+                status, detail = "fallback", str(e)
+        self._append_jsonl({
+            "ts": datetime.utcnow().isoformat() + "Z",
+            "session_id": self.session_id,
+            "event": "patch",
+            "status": status,
+            "detail": detail,
+            "reply_chars": len(reply),
+        })
+        return new_code
+
+    def _budget(self, max_tokens: Optional[int]) -> int:
+        """Tokens available to the history once the reply reservation is taken out."""
+        reserve = int(max_tokens or getattr(self.copilot, "max_tokens", 0) or 0)
+        return self.context_tokens - reserve
+
+    def _head_len(self) -> int:
+        """Number of leading messages never trimmed: system prompt and rolling summary."""
+        head = 1 if self.messages and self.messages[0]["role"] == "system" else 0
+        if len(self.messages) > head and self._is_summary(self.messages[head]):
+            head += 1
+        return head
+
+    @classmethod
+    def _is_summary(cls, message: Dict[str, str]) -> bool:
+        return message.get("role") == "assistant" and (message.get("content") or "").startswith(cls.SUMMARY_PREFIX)
+
+    # -------------------- Rolling summary --------------------
+    def wait_for_summary(self, timeout: Optional[float] = None) -> None:
+        """Block until a background summary (if any) has been applied."""
+        thread = self._summary_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _schedule_summary(self, max_tokens: Optional[int] = None) -> None:
+        """
+        If the history is above SUMMARY_TRIGGER_RATIO of the budget, fold the oldest
+        turns (down to SUMMARY_TARGET_RATIO) into the rolling summary on a daemon thread.
+        """
+        if self._summary_thread is not None and self._summary_thread.is_alive():
+            return
+        with self._lock:
+            budget = self._budget(max_tokens)
+            if self._history_tokens <= budget * self.SUMMARY_TRIGGER_RATIO:
+                return
+            head = self._head_len()
+            excess = self._history_tokens - budget * self.SUMMARY_TARGET_RATIO
+            count = 0
+            for m in self.messages[head:-1]:
+                if excess <= 0:
+                    break
+                excess -= TokenEstimator.count_message(m)
+                count += 1
+            # Keep the remaining tail starting at a user message
+            while head + count < len(self.messages) - 1 and self.messages[head + count]["role"] == "assistant":
+                count += 1
+            if count == 0:
+                return
+            previous = self.messages[head - 1] if head and self._is_summary(self.messages[head - 1]) else None
+            evicted = self.messages[head:head + count]
+
+        self._summary_thread = threading.Thread(
+            target=self._summarize, args=(previous, evicted), name=f"summary-{self.session_id}", daemon=True
+        )
+        self._summary_thread.start()
+
+    def _summarize(self, previous: Optional[Dict[str, str]], evicted: List[Dict[str, str]]) -> None:
+        """Summarize previous summary + evicted messages and splice the result into history."""
+        try:
+            lines = []
+            for m in evicted:
+                content = self.artifacts.hydrate(m.get("content") or "", keep=set())
+                if len(content) > self.SUMMARY_SOURCE_CHARS:
+                    content = content[: self.SUMMARY_SOURCE_CHARS] + " ...[truncated]"
+                lines.append(f"{m['role'].upper()}: {content}")
+            previous_text = previous["content"][len(self.SUMMARY_PREFIX):].strip() if previous else "(none)"
+            prompt = f"Previous summary:\n{previous_text}\n\nNew messages:\n" + "\n\n".join(lines)
+
+            data = self.copilot.chat_raw(
+                CopilotClient.compose_messages(self.SUMMARY_INSTRUCTIONS, prompt),
+                temperature=0,
+                max_tokens=self.SUMMARY_MAX_TOKENS,
+            )
+            summary = data["choices"][0]["message"]["content"].strip()
+        except Exception as e:
+            self._append_jsonl({
+                "ts": datetime.utcnow().isoformat() + "Z",
+                "session_id": self.session_id,
+                "event": "summary_error",
+                "error": f"{type(e).__name__}: {e}",
+            })
+            return
+
+        with self._lock:
+            # Splice only if the summarized messages are still where we found them
+            idx = next((i for i, m in enumerate(self.messages) if m is evicted[0]), None)
+            current = self.messages[idx:idx + len(evicted)] if idx is not None else []
+            if len(current) != len(evicted) or any(a is not b for a, b in zip(current, evicted)):
+                return
+            begin = idx - 1 if previous is not None and idx and self.messages[idx - 1] is previous else idx
+            summary_msg = {"role": "assistant", "content": f"{self.SUMMARY_PREFIX}\n{summary}"}
+            self._replace(self.messages[:begin] + [summary_msg] + self.messages[idx + len(evicted):])
+            self._append_jsonl({
+                "ts": datetime.utcnow().isoformat() + "Z",
+                "session_id": self.session_id,
+                "event": "summary",
+                "summarized": len(evicted),
+                "messages_len": len(self.messages),
+            })
 
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Mapping, Optional, Tuple
+
+from backend.src.data_io.file_reader import FileReader
+
+
+class PromptTemplate:
+    """
+    Immutable, precompiled prompt template.
+
+    The text is split once into literal segments and named slots:
+      literals[0] slot[0] literals[1] slot[1] ... literals[n]
+    so rendering is a single join instead of one str.replace pass per token over
+    the whole (possibly multi-hundred-KB) text. Placeholders are matched in one
+    scan, so text injected into one slot is never re-scanned for other tokens.
+
+    Typical usage:
+      tpl = PromptTemplate.compile(text, {"<<CORE_GUIDE>>": "core_guide", "{USER_QUERY}": "user_query"})
+      bound = tpl.bind({"core_guide": guide})      # static parts filled once
+      prompt = bound.render({"user_query": query})
+    """
+
+    __slots__ = ("literals", "slots")
+
+    def __init__(self, literals: Tuple[str, ...], slots: Tuple[str, ...]) -> None:
+        """
+        Args:
+            literals: Literal text segments; always one more than slots.
+            slots: Slot names between the literal segments.
+        """
+        if len(literals) != len(slots) + 1:
+            raise ValueError("a template needs exactly one more literal segment than slots")
+        self.literals = literals
+        self.slots = slots
+
+    @classmethod
+    def compile(cls, text: str, tokens: Mapping[str, str]) -> "PromptTemplate":
+        """
+        Split text at every occurrence of a token.
+
+        Args:
+            text: Template text.
+            tokens: Placeholder token -> slot name. Longer tokens win where tokens
+                overlap (e.g. "{{USER_QUERY}}" over "{USER_QUERY}").
+        """
+        if not tokens:
+            return cls((text,), ())
+        pattern = re.compile("|".join(re.escape(t) for t in sorted(tokens, key=len, reverse=True)))
+        literals, slots, pos = [], [], 0
+        for m in pattern.finditer(text):
+            literals.append(text[pos:m.start()])
+            slots.append(tokens[m.group(0)])
+            pos = m.end()
+        literals.append(text[pos:])
+        return cls(tuple(literals), tuple(slots))
+
+    @property
+    def slot_names(self) -> frozenset:
+        """Names of the slots still open in this template."""
+        return frozenset(self.slots)
+
+    def bind(self, values: Mapping[str, str]) -> "PromptTemplate":
+        """Return a new template with the slots named in values filled in (others stay open)."""
+        literals, slots, current = [], [], [self.literals[0]]
+        for name, literal in zip(self.slots, self.literals[1:]):
+            if name in values:
+                current.append(values[name])
+            else:
+                literals.append("".join(current))
+                slots.append(name)
+                current = []
+            current.append(literal)
+        literals.append("".join(current))
+        return PromptTemplate(tuple(literals), tuple(slots))
+
+    def render(self, values: Optional[Mapping[str, str]] = None) -> str:
+        """Fill every slot (missing values render as "") and return the text."""
+        values = values or {}
+        parts = [self.literals[0]]
+        for name, literal in zip(self.slots, self.literals[1:]):
+            parts.append(values.get(name, ""))
+            parts.append(literal)
+        return "".join(parts)
+
+
+class TemplateRegistry:
+    """
+    Process-wide cache of compiled prompt templates.
+
+    - Each file is read and compiled once; os.stat on every lookup picks up edits
+      (mtime/size change) without a restart.
+    - bind() memoizes templates whose static slots (e.g. knowledge blocks) are
+      already filled, keyed by a caller-supplied key for those values, so the big
+      injected blocks are joined once per (template version, blocks version).
+
+    Typical usage:
+      registry = TemplateRegistry(tokens)
+      tpl = registry.bind(path, blocks, memo_key=blocks_key)
+      prompt = tpl.render({"user_query": query})
+    """
+
+    def __init__(self, tokens: Mapping[str, str], max_bound: int = 32) -> None:
+        """
+        Args:
+            tokens: Placeholder token -> slot name used to compile every template.
+            max_bound: Number of memoized bound templates kept (LRU).
+        """
+        self.tokens = dict(tokens)
+        self.max_bound = int(max_bound)
+        self._templates: Dict[str, Tuple[Tuple[int, int], PromptTemplate]] = {}
+        self._bound: "OrderedDict[Tuple, PromptTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # -------------------- Public APIs --------------------
+    def get(self, path: str) -> PromptTemplate:
+        """Compiled template for path (recompiled only when the file changes)."""
+        return self._load(path)[1]
+
+    def version(self, path: str) -> Tuple[int, int]:
+        """(mtime_ns, size) of the template file as currently cached."""
+        return self._load(path)[0]
+
+    def bind(self, path: str, values: Mapping[str, str], memo_key: Optional[Hashable] = None) -> PromptTemplate:
+        """
+        Template for path with the given slots filled.
+
+        Args:
+            path: Template file.
+            values: Slot name -> text for the static slots.
+            memo_key: Identifies values (e.g. a content hash); None disables memoization.
+        """
+        version, template = self._load(path)
+        if memo_key is None:
+            return template.bind(values)
+        key = (os.path.abspath(path), version, memo_key)
+        with self._lock:
+            bound = self._bound.get(key)
+            if bound is not None:
+                self._bound.move_to_end(key)
+                return bound
+        bound = template.bind(values)
+        with self._lock:
+            self._bound[key] = bound
+            while len(self._bound) > self.max_bound:
+                self._bound.popitem(last=False)
+        return bound
+
+    def preload(self, paths: Iterable[str]) -> None:
+        """Read and compile the given templates ahead of the first request."""
+        for path in paths:
+            self._load(path)
+
+    def clear(self) -> None:
+        """Drop all compiled and bound templates."""
+        with self._lock:
+            self._templates.clear()
+            self._bound.clear()
+
+    # ------------------------------ helpers ------------------------------
+    def _load(self, path: str) -> Tuple[Tuple[int, int], PromptTemplate]:
+        abspath = os.path.abspath(path)
+        st = os.stat(abspath)
+        version = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._templates.get(abspath)
+        if cached and cached[0] == version:
+            return cached
+        entry = (version, PromptTemplate.compile(FileReader.read_text(abspath), self.tokens))
+        with self._lock:
+            self._templates[abspath] = entry
+        return entry
+
+
+if __name__ == "__main__":
+    registry = TemplateRegistry({"<<CORE_GUIDE>>": "core_guide", "{USER_QUERY}": "user_query"})
+    tpl = registry.get("backend/src/prompts/user.prompt.code.refinery.txt")
+    print(f"{len(tpl.slots)} slots: {sorted(tpl.slot_names)}")
+    print(tpl.bind({"core_guide": "<guide>"}).render({"user_query": "<query>"})[:400])
@@ -0,0 +1,406 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from backend.src.data_io.file_reader import FileReader
+
+
+class SessionStore(ABC):
+    """
+    Storage backend interface for ConversationManager.
+
+    A store persists the OpenAI-style messages of many sessions. Mutations are
+    expressed as small operations so backends can write only what changed.
+    """
+
+    @abstractmethod
+    def load(self, session_id: str) -> List[Dict[str, str]]:
+        """Return the persisted messages of a session (empty list if none)."""
+
+    @abstractmethod
+    def append(self, session_id: str, message: Dict[str, str]) -> None:
+        """Persist one new message at the end of the session."""
+
+    @abstractmethod
+    def drop(self, session_id: str, start: int, count: int) -> None:
+        """Persist the removal of messages[start:start + count] (e.g. history trimming)."""
+
+    @abstractmethod
+    def replace(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        """Overwrite the whole session (new conversation / reset)."""
+
+    @abstractmethod
+    def list_sessions(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Sessions as {"session_id", "updated_at" (epoch seconds), "message_count"}, most recent first."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Remove a session and all its messages."""
+
+    def purge(self, older_than_seconds: float) -> int:
+        """Delete sessions not updated for older_than_seconds; returns how many were removed."""
+        cutoff = time.time() - older_than_seconds
+        stale = [s["session_id"] for s in self.list_sessions() if s["updated_at"] < cutoff]
+        for session_id in stale:
+            self.delete(session_id)
+        return len(stale)
+
+
+class JsonlSessionStore(SessionStore):
+    """
+    Append-only, log-structured persistence for conversation messages.
+
+    Each session is stored as:
+      - {session_id}.json       snapshot: {"session_id", "updated_at", "seq", "messages"}
+      - {session_id}.log.jsonl  tail of operations applied after the snapshot
+
+    Operations are small records, so a turn costs I/O proportional to the new
+    message only:
+      {"seq": n, "op": "append",  "message": {...}}
+      {"seq": n, "op": "drop",    "start": i, "count": k}   # remove messages[i:i+k]
+      {"seq": n, "op": "replace", "messages": [...]}       # written as a fresh snapshot
+
+    Loading reads the snapshot and replays the ops whose seq is newer. Once the
+    tail holds compact_every ops, the current state is written as a new snapshot
+    (atomically) and the tail is truncated.
+
+    fsync policy:
+      "always"     fsync the tail after every op and every snapshot (crash-safe turns)
+      "compaction" fsync snapshots only (default)
+      "never"      leave flushing to the OS
+
+    Typical usage:
+      store = JsonlSessionStore("backend/src/outputs/sessions")
+      messages = store.load("demo")
+      store.append("demo", {"role": "user", "content": "hi"})
+    """
+
+    FSYNC_POLICIES = ("always", "compaction", "never")
+
+    def __init__(
+        self,
+        storage_dir: str = "backend/src/outputs/sessions",
+        compact_every: int = 200,
+        fsync: str = "compaction",
+    ) -> None:
+        """
+        Args:
+            storage_dir: Directory holding the snapshot and log files.
+            compact_every: Number of tail ops after which the session is compacted.
+            fsync: One of FSYNC_POLICIES.
+        """
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {self.FSYNC_POLICIES}, got {fsync!r}")
+        self.storage_dir = storage_dir
+        self.compact_every = max(1, int(compact_every))
+        self.fsync = fsync
+        os.makedirs(storage_dir, exist_ok=True)
+
+        # session_id -> {"messages": [...], "seq": last op seq, "tail": ops since snapshot}
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    # -------------------- Public APIs --------------------
+    def load(self, session_id: str) -> List[Dict[str, str]]:
+        with self._lock:
+            return list(self._session(session_id)["messages"])
+
+    def append(self, session_id: str, message: Dict[str, str]) -> None:
+        with self._lock:
+            state = self._session(session_id)
+            state["messages"].append(message)
+            self._write_op(session_id, state, {"op": "append", "message": message})
+
+    def drop(self, session_id: str, start: int, count: int) -> None:
+        if count <= 0:
+            return
+        with self._lock:
+            state = self._session(session_id)
+            del state["messages"][start:start + count]
+            self._write_op(session_id, state, {"op": "drop", "start": start, "count": count})
+
+    def replace(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        """Overwrite the whole session; written directly as a snapshot."""
+        with self._lock:
+            state = self._session(session_id)
+            state["messages"] = list(messages)
+            state["seq"] += 1
+            self._compact(session_id, state)
+
+    def list_sessions(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Scan storage_dir for snapshots / op logs (message_count requires a replay)."""
+        ids = set()
+        for name in os.listdir(self.storage_dir):
+            for suffix in (".log.jsonl", ".json"):
+                if name.endswith(suffix):
+                    ids.add(name[: -len(suffix)])
+                    break
+        sessions = []
+        with self._lock:
+            for session_id in ids:
+                paths = [p for p in self._paths(session_id).values() if os.path.exists(p)]
+                sessions.append({
+                    "session_id": session_id,
+                    "updated_at": max(os.path.getmtime(p) for p in paths),
+                    "message_count": len(self._session(session_id)["messages"]),
+                })
+        sessions.sort(key=lambda s: s["updated_at"], reverse=True)
+        return sessions[:limit] if limit is not None else sessions
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._state.pop(session_id, None)
+            for path in self._paths(session_id).values():
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def compact(self, session_id: str) -> None:
+        """Fold the op tail into a fresh snapshot now."""
+        with self._lock:
+            state = self._session(session_id)
+            if state["tail"]:
+                self._compact(session_id, state)
+
+    # -------------------- Internal --------------------
+    def _paths(self, session_id: str) -> Dict[str, str]:
+        return {
+            "snapshot": os.path.join(self.storage_dir, f"{session_id}.json"),
+            "log": os.path.join(self.storage_dir, f"{session_id}.log.jsonl"),
+        }
+
+    def _session(self, session_id: str) -> Dict[str, Any]:
+        """In-memory state of a session, replayed from disk on first access (lock held)."""
+        state = self._state.get(session_id)
+        if state is not None:
+            return state
+
+        paths = self._paths(session_id)
+        messages: List[Dict[str, str]] = []
+        seq = 0
+        if os.path.exists(paths["snapshot"]):
+            data = FileReader.read_json(paths["snapshot"])
+            messages = list(data.get("messages", []))
+            seq = int(data.get("seq", 0))
+
+        tail = 0
+        if os.path.exists(paths["log"]):
+            # read_jsonl skips a torn last line left by a crash mid-append
+            for rec in FileReader.read_jsonl(paths["log"]):
+                if int(rec.get("seq", 0)) <= seq:
+                    continue  # already folded into the snapshot
+                op = rec.get("op")
+                if op == "append":
+                    messages.append(rec["message"])
+                elif op == "drop":
+                    del messages[rec["start"]:rec["start"] + rec["count"]]
+                elif op == "replace":
+                    messages = list(rec["messages"])
+                seq = int(rec["seq"])
+                tail += 1
+            # Terminate a torn last line so the next append starts on a fresh line
+            with open(paths["log"], "rb+") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+
+        state = {"messages": messages, "seq": seq, "tail": tail}
+        self._state[session_id] = state
+        return state
+
+    def _write_op(self, session_id: str, state: Dict[str, Any], record: Dict[str, Any]) -> None:
+        state["seq"] += 1
+        state["tail"] += 1
+        line = json.dumps({"seq": state["seq"], **record}, ensure_ascii=False) + "\n"
+        with open(self._paths(session_id)["log"], "a", encoding="utf-8", newline="\n") as f:
+            f.write(line)
+            if self.fsync == "always":
+                f.flush()
+                os.fsync(f.fileno())
+        if state["tail"] >= self.compact_every:
+            self._compact(session_id, state)
+
+    def _compact(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Write the snapshot atomically, then truncate the tail (lock held)."""
+        paths = self._paths(session_id)
+        payload = {
+            "session_id": session_id,
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+            "seq": state["seq"],
+            "messages": state["messages"],
+        }
+        tmp = paths["snapshot"] + ".tmp"
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            json.dump(payload, f, ensure_ascii=False)
+            if self.fsync != "never":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, paths["snapshot"])
+
+        # A crash before this truncation is harmless: ops <= seq are skipped on replay
+        with open(paths["log"], "w", encoding="utf-8"):
+            pass
+        state["tail"] = 0
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    SQLite-backed session store for many concurrent sessions (e.g. Streamlit users).
+
+    - WAL mode: readers never block the writer; busy_timeout serializes writers.
+    - One connection per thread (Streamlit runs each script session in its own thread).
+    - sessions(session_id PK, created_at, updated_at, message_count), indexed on updated_at,
+      so listing recent sessions and retention purges are index range scans.
+    - messages as rows keyed by (session_id, id); appends and trims touch only
+      the affected rows.
+
+    Typical usage:
+      store = SqliteSessionStore()
+      cm = ConversationManager(session_id="ui-1234", store=store)
+      store.purge(older_than_seconds=30 * 24 * 3600)
+    """
+
+    def __init__(self, db_path: str = "backend/src/outputs/sessions/sessions.sqlite3") -> None:
+        """
+        Args:
+            db_path: SQLite file; created (with schema) if missing.
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " message_count INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " id INTEGER PRIMARY KEY,"
+            " session_id TEXT NOT NULL,"
+            " role TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " extra TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id)")
+
+    # -------------------- Public APIs --------------------
+    def load(self, session_id: str) -> List[Dict[str, str]]:
+        rows = self._conn().execute(
+            "SELECT role, content, extra FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+        ).fetchall()
+        return [self._from_row(*row) for row in rows]
+
+    def append(self, session_id: str, message: Dict[str, str]) -> None:
+        with self._transaction() as conn:
+            self._insert(conn, session_id, [message])
+            self._touch(conn, session_id, delta=1)
+
+    def drop(self, session_id: str, start: int, count: int) -> None:
+        if count <= 0:
+            return
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "DELETE FROM messages WHERE id IN ("
+                " SELECT id FROM messages WHERE session_id = ? ORDER BY id LIMIT ? OFFSET ?)",
+                (session_id, count, start),
+            )
+            self._touch(conn, session_id, delta=-cur.rowcount)
+
+    def replace(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._insert(conn, session_id, messages)
+            self._touch(conn, session_id, count=len(messages))
+
+    def list_sessions(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT session_id, updated_at, message_count FROM sessions ORDER BY updated_at DESC LIMIT ?",
+            (-1 if limit is None else int(limit),),
+        ).fetchall()
+        return [{"session_id": r[0], "updated_at": r[1], "message_count": r[2]} for r in rows]
+
+    def delete(self, session_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def purge(self, older_than_seconds: float) -> int:
+        """Bulk-delete stale sessions in one transaction (uses the updated_at index)."""
+        cutoff = time.time() - older_than_seconds
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM messages WHERE session_id IN (SELECT session_id FROM sessions WHERE updated_at < ?)",
+                (cutoff,),
+            )
+            return conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+
+    def close(self) -> None:
+        """Close this thread's connection (other threads keep theirs)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # -------------------- Internal --------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """BEGIN IMMEDIATE ... COMMIT on this thread's connection (rollback on error)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, session_id: str, messages: List[Dict[str, str]]) -> None:
+        rows = []
+        for m in messages:
+            extra = {k: v for k, v in m.items() if k not in ("role", "content")}
+            rows.append((session_id, m.get("role", ""), m.get("content", ""), json.dumps(extra, ensure_ascii=False) if extra else None))
+        conn.executemany("INSERT INTO messages (session_id, role, content, extra) VALUES (?, ?, ?, ?)", rows)
+
+    @staticmethod
+    def _touch(conn: sqlite3.Connection, session_id: str, delta: int = 0, count: Optional[int] = None) -> None:
+        """Upsert the session row: bump updated_at and adjust (or set) message_count."""
+        now = time.time()
+        conn.execute(
+            "INSERT INTO sessions (session_id, created_at, updated_at, message_count) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at,"
+            " message_count = CASE WHEN ? IS NULL THEN message_count + ? ELSE ? END",
+            (session_id, now, now, count if count is not None else max(delta, 0), count, delta, count),
+        )
+
+    @staticmethod
+    def _from_row(role: str, content: str, extra: Optional[str]) -> Dict[str, str]:
+        message = {"role": role, "content": content}
+        if extra:
+            message.update(json.loads(extra))
+        return message
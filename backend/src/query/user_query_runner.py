@@ -2,22 +2,53 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
+import re
+import hashlib
 from typing import Dict, Optional, Tuple, Any
-from backend.src.data_io.file_reader import FileReader
 from backend.src.rule_compiler.rules_compiler import RulesCompiler
+from backend.src.rule_compiler.rules_cache import RulesCache
+from backend.src.rule_compiler.rule_index import RuleIndex
 from backend.src.llm.copilot_client import CopilotClient
+from backend.src.query.prompt_templates import TemplateRegistry
+from backend.src.library.example_library import ExampleLibrary
 
 
 class UserQueryRunner:
     """
     Orchestrates a full pipeline:
-      1) Compile three knowledge blocks from the rules workbook (.xlsx).
-      2) Read system & user prompt templates from disk.
-      3) Inject knowledge blocks into both templates.
+      1) Compile three knowledge blocks from the rules workbook (.xlsx), cached by content hash.
+      2) Load system & user prompt templates (compiled once per file version, see TemplateRegistry).
+      3) Inject knowledge blocks into both templates (memoized while the blocks don't change).
       4) Render the user prompt with {USER_QUERY} (and optional placeholders).
       5) Call CopilotClient and return the assistant's text.
+
+    Prompt layouts:
+      - "template": blocks and the query are placed wherever the templates put them.
+      - "stable": everything except the query goes into the system message with
+        normalized whitespace, and the user message is only the query. The system
+        message is then byte-identical for every query built from the same workbook
+        and templates, so provider-side prompt caching can reuse it. Its fingerprint
+        is exposed as last_prefix_fingerprint (use without retrieval_top_k, whose
+        blocks vary per query).
+
+    With an ExampleLibrary, <<EXAMPLES_PLAYBOOK>> additionally receives the reference
+    modules most similar to the query (in the "stable" layout they are sent in the
+    user message, ahead of the query, so the prefix stays unchanged).
     """
 
+    PROMPT_LAYOUTS = ("template", "stable")
+    # Query placeholders as written in the templates
+    _QUERY_TOKENS = ("{{USER_QUERY}}", "{USER_QUERY}")
+    # "stable" layout: stands in for the query inside the static prefix / introduces the query
+    STABLE_QUERY_REFERENCE = "(given in the user message)"
+    STABLE_QUERY_HEADER = "User query (process description):\n"
+    STABLE_EXAMPLES_HEADER = "Reference modules similar to this process:\n\n"
+
+    # Process-wide compiled templates (created on first use)
+    _shared_templates: Optional[TemplateRegistry] = None
+    # Normalized "stable" prefixes and their fingerprints keyed by (blocks key, template versions)
+    _prefix_memo: Dict[Tuple, Tuple[str, str]] = {}
+
     _DEFAULT_TOKENS_MAP = {
         # Primary tokens
         "<<CORE_GUIDE>>": "core_guide",
@@ -25,26 +56,68 @@ class UserQueryRunner:
         "<<VARIABLE_PATH_MAPPING>>": "variable_mapping",
         # Aliases (keep flexibility with earlier templates)
         "<<TOPICAL_RULES>>": "type_definitions",
-        "<<EXAMPLES_PLAYBOOK>>": "variable_mapping",
+        # Variable mapping, preceded by library examples when an ExampleLibrary is set
+        "<<EXAMPLES_PLAYBOOK>>": "examples_playbook",
     }
 
     def __init__(
         self,
         copilot: Optional[CopilotClient] = None,
         sheet_names: Optional[Dict[str, str]] = None,
+        rules_cache: Optional[RulesCache] = None,
+        retrieval_top_k: Optional[int] = None,
+        retrieval_token_budget: Optional[int] = 8000,
+        mapping_mode: str = "flat",
+        prompt_layout: str = "template",
+        templates: Optional[TemplateRegistry] = None,
+        example_library: Optional[ExampleLibrary] = None,
+        example_top_k: int = 2,
+        example_token_budget: Optional[int] = 6000,
     ) -> None:
         """
         Args:
-            copilot: Optional CopilotClient instance; if None, a default will be created.
+            copilot: Optional CopilotClient instance; if None, a default is created on first
+                use (building prompts alone never needs one).
             sheet_names: Optional mapping to override sheet names.
+            rules_cache: Optional RulesCache; if None, a default (in-process + on-disk) cache is used.
+            retrieval_top_k: If set, inject only the top-k most relevant functions / type
+                declarations / paths (each) for the user query instead of the full blocks.
+            retrieval_token_budget: Estimated token cap for all retrieved items (None = no cap).
+            mapping_mode: "flat" (one bullet per path) or "trie" (compact prefix tree) rendering
+                of the VARIABLE_PATH_MAPPING block.
+            prompt_layout: "template" (default) or "stable" (cache-friendly fixed prefix, query last).
+            templates: Optional TemplateRegistry; if None, the process-wide registry is used.
+            example_library: Optional ExampleLibrary used to add similar reference modules
+                as few-shot examples (e.g. ExampleLibrary.shared()).
+            example_top_k: Maximum number of reference modules per prompt.
+            example_token_budget: Estimated token cap for all reference modules (None = no cap).
         """
-        self.copilot = copilot or CopilotClient()
+        if prompt_layout not in self.PROMPT_LAYOUTS:
+            raise ValueError(f"prompt_layout must be one of {self.PROMPT_LAYOUTS}, got {prompt_layout!r}")
+        self._copilot = copilot
+        self.rules_cache = rules_cache or RulesCache()
+        self.retrieval_top_k = retrieval_top_k
+        self.retrieval_token_budget = retrieval_token_budget
+        self.mapping_mode = mapping_mode
+        self.prompt_layout = prompt_layout
+        self.templates = templates or self.shared_templates()
+        self.example_library = example_library
+        self.example_top_k = example_top_k
+        self.example_token_budget = example_token_budget
+        self.last_prefix_fingerprint: Optional[str] = None
         self.sheet_names = sheet_names or {
             "documentation": "Documentation",
             "definitions": "TypeDefinitions.d.ts",
             "mapping": "AUS mapping v14.6",
         }
 
+    @property
+    def copilot(self) -> CopilotClient:
+        """Chat client used by run()."""
+        if self._copilot is None:
+            self._copilot = CopilotClient()
+        return self._copilot
+
     def build_prompts(
         self,
         rules_xlsx_path: str,
@@ -56,31 +129,92 @@ class UserQueryRunner:
         """
         Build fully rendered system & user prompts ready for model invocation.
         """
-        # 1) Compile three text blocks from the rules workbook
-        compiler = RulesCompiler(rules_xlsx_path)
-        blocks = {
-            "core_guide": compiler.build_core_guide_text(self.sheet_names["documentation"]),
-            "type_definitions": compiler.build_type_definitions_text(self.sheet_names["definitions"]),
-            "variable_mapping": compiler.build_mapping_text(self.sheet_names["mapping"]),
-        }
+        # 1) Compile three text blocks from the rules workbook (recompiled only when it changes)
+        if self.retrieval_top_k:
+            # Only the rule items relevant to this query (BM25 over functions / types / paths)
+            index = RuleIndex.for_workbook(rules_xlsx_path, self.sheet_names, self.rules_cache)
+            items = index.select(user_query, top_k=self.retrieval_top_k, token_budget=self.retrieval_token_budget)
+            blocks = RulesCompiler.render_items(items, self.mapping_mode)
+            blocks_key = None  # per-query blocks: nothing worth memoizing
+        else:
+            blocks = self.rules_cache.get_blocks(rules_xlsx_path, self.sheet_names, self.mapping_mode)
+            blocks_key = self.rules_cache.make_key(
+                "blocks", rules_xlsx_path, self.sheet_names, {"mapping_mode": self.mapping_mode}
+            )
 
-        # 2) Read raw templates
-        system_tpl = FileReader.read_text(system_prompt_path)
-        user_tpl = FileReader.read_text(user_prompt_path)
+        # Similar reference modules from the example library (few-shot)
+        examples = ""
+        if self.example_library is not None:
+            examples = ExampleLibrary.render(
+                self.example_library.select(user_query, self.example_top_k, self.example_token_budget)
+            )
 
-        # 3) Inject blocks into templates
-        system_filled = self._inject_blocks(system_tpl, blocks)
-        user_with_blocks = self._inject_blocks(user_tpl, blocks)
+        # 2) + 3) Compiled templates with the blocks already joined in (memoized per blocks key)
+        values = {key: blocks.get(key, "") for key in set(self._DEFAULT_TOKENS_MAP.values())}
+        values["examples_playbook"] = blocks.get("variable_mapping", "")
+        dynamic: Dict[str, str] = {}
+        if examples and self.prompt_layout != "stable":
+            # Per-query slot: left open in the bound templates and filled at render time
+            dynamic["examples_playbook"] = examples + "\n\n" + values.pop("examples_playbook")
+        bind_key = (blocks_key, tuple(sorted(values))) if blocks_key else None
+        system_tpl = self.templates.bind(system_prompt_path, values, memo_key=bind_key)
+        user_tpl = self.templates.bind(user_prompt_path, values, memo_key=bind_key)
 
-        # 4) Render user prompt with a safe replacement (avoid str.format pitfalls)
-        #    We ONLY replace the {USER_QUERY} token to prevent accidental .format()
-        #    expansion of braces that appear inside injected knowledge blocks.
-        if "{USER_QUERY}" not in user_with_blocks:
-            pass
+        if self.prompt_layout == "stable":
+            # Static prefix = system + user template (query slot neutralized); query goes last
+            memo_key = None
+            if blocks_key is not None:
+                memo_key = (
+                    blocks_key,
+                    os.path.abspath(system_prompt_path), self.templates.version(system_prompt_path),
+                    os.path.abspath(user_prompt_path), self.templates.version(user_prompt_path),
+                )
+            prefix = self._prefix_memo.get(memo_key) if memo_key else None
+            if prefix is None:
+                reference = {"user_query": self.STABLE_QUERY_REFERENCE}
+                system_prompt = (
+                    self._normalize(system_tpl.render(reference)) + "\n\n" + self._normalize(user_tpl.render(reference))
+                )
+                prefix = (system_prompt, self.prefix_fingerprint(system_prompt))
+                if memo_key:
+                    if len(self._prefix_memo) >= 32:
+                        self._prefix_memo.clear()
+                    self._prefix_memo[memo_key] = prefix
+            system_prompt, self.last_prefix_fingerprint = prefix
+            user_prompt = self.STABLE_QUERY_HEADER + user_query.strip()
+            if examples:
+                user_prompt = self.STABLE_EXAMPLES_HEADER + examples + "\n\n" + user_prompt
+            return system_prompt, user_prompt
 
-        user_rendered = user_with_blocks.replace("{USER_QUERY}", user_query)
+        # 4) Render the query slot by a single join (no str.format, so braces inside
+        #    the injected knowledge blocks are never interpreted)
+        query = {"user_query": user_query, **dynamic}
+        system_filled = system_tpl.render(query)
+        user_rendered = user_tpl.render(query)
+        self.last_prefix_fingerprint = self.prefix_fingerprint(system_filled)
         return system_filled, user_rendered
 
+    def warm(self, rules_xlsx_path: str, system_prompt_path: str, user_prompt_path: str) -> None:
+        """
+        Compile the rule blocks and templates (and bind them) ahead of the first
+        query, so a later build_prompts() only renders the query slot.
+        """
+        self.build_prompts(rules_xlsx_path, system_prompt_path, user_prompt_path, user_query="")
+
+    @classmethod
+    def shared_templates(cls) -> TemplateRegistry:
+        """Process-wide TemplateRegistry compiled with this runner's placeholder tokens."""
+        if cls._shared_templates is None:
+            tokens = dict(cls._DEFAULT_TOKENS_MAP)
+            tokens.update({token: "user_query" for token in cls._QUERY_TOKENS})
+            cls._shared_templates = TemplateRegistry(tokens)
+        return cls._shared_templates
+
+    @staticmethod
+    def prefix_fingerprint(system_prompt: str) -> str:
+        """Short SHA-256 fingerprint of a prompt prefix (equal fingerprints = cacheable prefix)."""
+        return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
     def run(
         self,
         rules_xlsx_path: str,
@@ -102,15 +236,11 @@ class UserQueryRunner:
         )
         return self.copilot.chat_text(system_prompt, user_prompt, extra_messages=None, **chat_overrides)
 
-    def _inject_blocks(self, template: str, blocks: Dict[str, str]) -> str:
-        """
-        Replace supported placeholders in the template with compiled text blocks.
-        """
-        out = template
-        for token, key in self._DEFAULT_TOKENS_MAP.items():
-            if token in out:
-                out = out.replace(token, blocks.get(key, ""))
-        return out
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Deterministic whitespace: LF line endings, no trailing spaces, at most one blank line in a row."""
+        lines = [line.rstrip() for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,216 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class _TrieNode:
+    __slots__ = ("children", "placeholders", "terminal")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.placeholders: List[str] = []  # keys of placeholder children, in insertion order
+        self.terminal = False
+
+
+class PathTrie:
+    """
+    Prefix tree over dotted variable paths (e.g. "Units.<UnitName>.Parameters.<Param>").
+
+    - Renders a compact nested representation of the mapping sheet: shared prefixes
+      are written once, single-child chains are joined with ".", and sibling
+      sub-trees with identical shape are collapsed into one "{A | B}" line.
+    - Answers exact and placeholder-aware lookups segment by segment over the set of
+      live nodes (placeholder segments like "<UnitName>" match any single segment).
+      Sibling sub-trees with the same shape are followed once, so a lookup costs the
+      path length times the alternatives at placeholder / wildcard segments.
+    """
+
+    def __init__(self) -> None:
+        self.root = _TrieNode()
+        self._size = 0
+        self._shapes: Optional[Dict[int, int]] = None  # id(node) -> shape class, built lazily
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[str]) -> "PathTrie":
+        trie = cls()
+        for p in paths:
+            trie.insert(p)
+        return trie
+
+    # -------------------- Build / lookup --------------------
+    def insert(self, path: str) -> None:
+        """Add one dotted path."""
+        node = self.root
+        for seg in path.split("."):
+            child = node.children.get(seg)
+            if child is None:
+                child = node.children[seg] = _TrieNode()
+                if self.is_placeholder(seg):
+                    node.placeholders.append(seg)
+                self._shapes = None
+            node = child
+        if not node.terminal:
+            self._shapes = None
+            node.terminal = True
+            self._size += 1
+
+    def __contains__(self, path: str) -> bool:
+        node = self._find(path.split("."))
+        return node is not None and node.terminal
+
+    def __len__(self) -> int:
+        return self._size
+
+    def has_prefix(self, prefix: str) -> bool:
+        """True if any stored path starts with the given dotted prefix (exact segments)."""
+        return self._find(prefix.split(".")) is not None
+
+    def match(self, path: str, allow_prefix: bool = False, wildcard: Optional[str] = None) -> Optional[str]:
+        """
+        Find the stored pattern matching a concrete path.
+
+        A stored placeholder segment ("<...>") matches any single concrete segment;
+        of several matching patterns the one with the most literal segments is returned.
+
+        Args:
+            path: Concrete dotted path, e.g. "Units.FCCU.Parameters.Intake".
+            allow_prefix: Also accept paths that stop at an inner node
+                (e.g. "Units.FCCU.Parameters" for a DataRequest of a whole group).
+            wildcard: Optional segment value in path that matches any stored segment
+                (e.g. a segment computed at run time, unknown statically).
+
+        Returns:
+            The matching stored pattern, or None.
+        """
+        shapes = self._shape_classes()
+        # Live (node, trail, literal segment count) per segment, literal branches first
+        live: List[Tuple[_TrieNode, Tuple[str, ...], int]] = [(self.root, (), 0)]
+        for seg in path.split("."):
+            step: Dict[Tuple[int, int], Tuple[_TrieNode, Tuple[str, ...], int]] = {}
+            for node, trail, literals in live:
+                if wildcard is not None and seg == wildcard:
+                    keys: Iterable[str] = node.children
+                else:
+                    keys = [k for k in node.placeholders if k != seg]
+                    if seg in node.children:
+                        keys.insert(0, seg)
+                for key in keys:
+                    child = node.children[key]
+                    count = literals + (key == seg)
+                    # Same-shaped sub-trees answer the rest of the path alike: keep the first
+                    step.setdefault((shapes[id(child)], count), (child, trail + (key,), count))
+            if not step:
+                return None
+            live = list(step.values())
+        found = [(literals, trail) for node, trail, literals in live if node.terminal or (allow_prefix and node.children)]
+        if not found:
+            return None
+        # Most literal segments wins; ties keep the earlier (literal-first) branch
+        return ".".join(max(found, key=lambda f: f[0])[1])
+
+    # -------------------- Rendering --------------------
+    def render_lines(self, top: Optional[str] = None) -> List[str]:
+        """
+        Render the trie (or only the sub-tree under one top-level segment) as nested
+        markdown bullets. Each indented line continues its parent path with ".".
+        """
+        out: List[str] = []
+        sigs: Dict[int, tuple] = {}
+        if top is None:
+            for labels, child in self._grouped_children(self.root, sigs):
+                self._emit(self._label(labels), child, 0, out, sigs)
+        elif top in self.root.children:
+            self._emit(top, self.root.children[top], 0, out, sigs)
+        return out
+
+    def _emit(self, label: str, node: _TrieNode, depth: int, out: List[str], sigs: Dict[int, tuple]) -> None:
+        # Compress single-child chains: A -> B -> C becomes "A.B.C"
+        while not node.terminal and len(node.children) == 1:
+            (seg, node), = node.children.items()
+            label = f"{label}.{seg}"
+
+        indent = "  " * depth
+        note = " (also a full path)" if node.terminal and node.children else ""
+        if not node.children:
+            out.append(f"{indent}- `{label}`")
+            return
+
+        groups = self._grouped_children(node, sigs)
+        if all(not child.children for _, child in groups):
+            # Only leaves below: list them inline ("[...]" = optional when the prefix is a path too)
+            leaves = self._label([lab for labels, _ in groups for lab in labels])
+            suffix = f"[.{leaves}]" if node.terminal else f".{leaves}"
+            out.append(f"{indent}- `{label}{suffix}`")
+            return
+
+        out.append(f"{indent}- `{label}`{note}")
+        for labels, child in groups:
+            self._emit(self._label(labels), child, depth + 1, out, sigs)
+
+    def _grouped_children(self, node: _TrieNode, sigs: Dict[int, tuple]) -> List[Tuple[List[str], _TrieNode]]:
+        """Children grouped by identical sub-tree shape (placeholder-collapsed siblings)."""
+        groups: Dict[tuple, Tuple[List[str], _TrieNode]] = {}
+        for seg in sorted(node.children):
+            child = node.children[seg]
+            sig = self._signature(child, sigs)
+            if sig in groups:
+                groups[sig][0].append(seg)
+            else:
+                groups[sig] = ([seg], child)
+        return list(groups.values())
+
+    def _signature(self, node: _TrieNode, sigs: Dict[int, tuple]) -> tuple:
+        sig = sigs.get(id(node))
+        if sig is None:
+            sig = (node.terminal, tuple((seg, self._signature(c, sigs)) for seg, c in sorted(node.children.items())))
+            sigs[id(node)] = sig
+        return sig
+
+    # ------------------------------ helpers ------------------------------
+    def _shape_classes(self) -> Dict[int, int]:
+        """Map id(node) -> small int shared by all nodes whose sub-trees are identical."""
+        if self._shapes is not None:
+            return self._shapes
+        shapes: Dict[int, int] = {}
+        interned: Dict[tuple, int] = {}
+
+        def visit(node: _TrieNode) -> int:
+            key = (node.terminal, tuple(sorted((seg, visit(c)) for seg, c in node.children.items())))
+            shapes[id(node)] = interned.setdefault(key, len(interned))
+            return shapes[id(node)]
+
+        visit(self.root)
+        self._shapes = shapes
+        return shapes
+
+    def _find(self, segs: List[str]) -> Optional[_TrieNode]:
+        node = self.root
+        for seg in segs:
+            node = node.children.get(seg)
+            if node is None:
+                return None
+        return node
+
+    @staticmethod
+    def _label(labels: List[str]) -> str:
+        return labels[0] if len(labels) == 1 else "{" + " | ".join(labels) + "}"
+
+    @staticmethod
+    def is_placeholder(seg: str) -> bool:
+        return len(seg) > 2 and seg.startswith("<") and seg.endswith(">")
+
+
+if __name__ == "__main__":
+    trie = PathTrie.from_paths([
+        "Units.<UnitName>.Parameters.<Param>",
+        "Units.<UnitName>.DeferredCut.<Cut>",
+        "Units.<UnitName>.DeferredCut.<Cut>.Properties",
+        "Streams.<StreamName>.Volume",
+        "Streams.<StreamName>.Mass",
+        "Streams.<StreamName>.Properties.<Prop>",
+    ])
+    print("\n".join(trie.render_lines()))
+    print(trie.match("Units.FCCU.Parameters.Intake"))
+    print(trie.match("Units.FCCU.Parameters", allow_prefix=True))
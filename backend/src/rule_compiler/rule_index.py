@@ -0,0 +1,193 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.src.rule_compiler.rules_compiler import RulesCompiler
+from backend.src.rule_compiler.rules_cache import RulesCache
+from backend.src.llm.token_estimator import TokenEstimator
+
+
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased word tokens plus their camelCase / digit sub-parts, so that
+    "setData" matches queries mentioning "set data" and "<UnitName>" matches "unit".
+    """
+    out: List[str] = []
+    for word in _WORD_RE.findall(text or ""):
+        out.append(word.lower())
+        parts = _CAMEL_RE.findall(word)
+        if len(parts) > 1:
+            out.extend(p.lower() for p in parts)
+    return out
+
+
+class RuleIndex:
+    """
+    Offline BM25 index over individual rule items (Documentation functions,
+    TypeScript declarations, mapping paths) with NumPy scoring.
+
+    Used to inject only the items relevant to a user query instead of the
+    full CORE_GUIDE / TYPE_DEFINITIONS / VARIABLE_PATH_MAPPING blocks.
+
+    Typical usage:
+      index = RuleIndex.for_workbook(xlsx_path)
+      items = index.select(user_query, top_k=25, token_budget=6000)
+      blocks = RulesCompiler.render_items(items)
+    """
+
+    _memo: Dict[str, "RuleIndex"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, items: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75) -> None:
+        """
+        Args:
+            items: Rule items as returned by RulesCompiler.extract_all_items.
+            k1: BM25 term-frequency saturation.
+            b: BM25 length normalization.
+        """
+        self.items = items
+        self.k1 = float(k1)
+        self.b = float(b)
+
+        vocab: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        doc_len = np.zeros(len(items), dtype=np.float32)
+        for d, item in enumerate(items):
+            toks = tokenize(f"{item.get('group', '')} {item.get('text', '')}")
+            doc_len[d] = len(toks)
+            for t in toks:
+                term_ids.append(vocab.setdefault(t, len(vocab)))
+                doc_ids.append(d)
+        self.vocab = vocab
+
+        # Postings: (term, doc) pairs with term frequency, grouped by term (CSR layout)
+        n_docs = max(len(items), 1)
+        pairs = np.asarray(term_ids, dtype=np.int64) * n_docs + np.asarray(doc_ids, dtype=np.int64)
+        uniq, tf = np.unique(pairs, return_counts=True)
+        post_term = uniq // n_docs
+        self._post_doc = (uniq % n_docs).astype(np.int32)
+        self._indptr = np.concatenate(([0], np.cumsum(np.bincount(post_term, minlength=len(vocab)))))
+
+        df = np.diff(self._indptr).astype(np.float32)
+        idf = np.log1p((len(items) - df + 0.5) / (df + 0.5))
+        avgdl = float(doc_len.mean()) if len(items) else 1.0
+        norm = self.k1 * (1.0 - self.b + self.b * doc_len[self._post_doc] / max(avgdl, 1e-9))
+        tf = tf.astype(np.float32)
+        # Precomputed per-posting BM25 weight -> a query is just a few vector adds
+        self._weight = (idf[post_term] * tf * (self.k1 + 1.0) / (tf + norm)).astype(np.float32)
+
+    # -------------------- Construction --------------------
+    @classmethod
+    def for_workbook(
+        cls,
+        xlsx_path: str,
+        sheet_names: Optional[Dict[str, str]] = None,
+        rules_cache: Optional[RulesCache] = None,
+    ) -> "RuleIndex":
+        """
+        Return the (process-wide memoized) index for a rules workbook. Items are
+        extracted through RulesCache, so the index is rebuilt only when the workbook changes.
+        """
+        cache = rules_cache or RulesCache()
+        key = cache.make_key("items", xlsx_path, sheet_names)
+        with cls._lock:
+            if key in cls._memo:
+                return cls._memo[key]
+
+        items = cache.get_or_build(
+            "items",
+            xlsx_path,
+            sheet_names,
+            lambda: RulesCompiler(xlsx_path).extract_all_items(sheet_names),
+        )
+        index = cls(items)
+        with cls._lock:
+            cls._memo[key] = index
+        return index
+
+    # -------------------- Query --------------------
+    def score(self, query: str) -> np.ndarray:
+        """BM25 score of every item for the query (float32 array aligned with self.items)."""
+        scores = np.zeros(len(self.items), dtype=np.float32)
+        for t in set(tokenize(query)):
+            tid = self.vocab.get(t)
+            if tid is None:
+                continue
+            lo, hi = self._indptr[tid], self._indptr[tid + 1]
+            # Doc ids are unique within one term's postings, so fancy-index add is safe
+            scores[self._post_doc[lo:hi]] += self._weight[lo:hi]
+        return scores
+
+    def search(self, query: str, top_k: int = 10, kinds: Optional[Iterable[str]] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Return up to top_k (score, item) pairs with a positive score, best first.
+
+        Args:
+            query: Free-text query (e.g. the user's process description).
+            top_k: Maximum number of results.
+            kinds: Optional subset of item kinds ("function", "type", "path").
+        """
+        scores = self.score(query)
+        if kinds is not None:
+            allowed = set(kinds)
+            mask = np.array([it["kind"] in allowed for it in self.items], dtype=bool)
+            scores = np.where(mask, scores, 0.0)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [(float(scores[i]), self.items[i]) for i in order if scores[i] > 0]
+
+    def select(self, query: str, top_k: int = 25, token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Pick the most relevant items for a prompt: at most top_k per kind, best
+        first, skipping items that no longer fit into the token budget.
+
+        Args:
+            query: Free-text query.
+            top_k: Maximum items per kind (function / type / path).
+            token_budget: Optional cap on the estimated tokens of all selected items.
+
+        Returns:
+            Selected items in their original (sheet) order.
+        """
+        scores = self.score(query)
+        per_kind: Dict[str, int] = {}
+        remaining = token_budget if token_budget is not None else float("inf")
+        chosen: List[int] = []
+        for i in np.argsort(-scores, kind="stable"):
+            if scores[i] <= 0:
+                break
+            item = self.items[i]
+            if per_kind.get(item["kind"], 0) >= top_k:
+                continue
+            cost = self.estimate_tokens(item["text"])
+            if cost > remaining:
+                continue
+            remaining -= cost
+            per_kind[item["kind"]] = per_kind.get(item["kind"], 0) + 1
+            chosen.append(int(i))
+        return [self.items[i] for i in sorted(chosen)]
+
+    # ------------------------------ helpers ------------------------------
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Token estimate of an item (shared, memoized TokenEstimator)."""
+        return max(1, TokenEstimator.count(text or ""))
+
+
+if __name__ == "__main__":
+    sample_path = "backend/src/rules/AUS_JS_Functions_From_Documentation.xlsx"
+    query = "Split the FCU Feed Splitter feed using stream volume and the FCCU Intake parameter"
+
+    index = RuleIndex.for_workbook(sample_path)
+    for score, item in index.search(query, top_k=15):
+        print(f"{score:6.2f}  [{item['kind']}] {item['name']}")
@@ -0,0 +1,208 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import json
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from backend.src.data_io.file_reader import FileReader
+from backend.src.data_io.file_writer import FileWriter
+from backend.src.rule_compiler.rules_compiler import RulesCompiler
+
+
+class RulesCache:
+    """
+    Two-level cache (in-process + on-disk) for RulesCompiler output.
+
+    Entries are keyed on:
+      - the SHA-256 of the workbook bytes,
+      - the sheet names used for compilation,
+      - RulesCompiler.COMPILER_VERSION,
+    so any edit to the workbook (or to the compiler output format) invalidates
+    them automatically. Repeat sessions get the compiled blocks in milliseconds
+    instead of re-parsing the .xlsx.
+
+    Typical usage:
+      cache = RulesCache()
+      blocks = cache.get_blocks("backend/src/rules/AUS_JS_Functions_From_Documentation.xlsx")
+    """
+
+    # Process-wide state shared by all instances (Streamlit reruns, batch workers, ...)
+    _memory: Dict[str, Any] = {}
+    _hash_memo: Dict[str, Tuple[int, int, str]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, cache_dir: Optional[str] = "backend/src/outputs/cache/rules") -> None:
+        """
+        Args:
+            cache_dir: Directory for persisted entries; None keeps the cache in-process only.
+        """
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # -------------------- Public APIs --------------------
+    def get_blocks(
+        self,
+        xlsx_path: str,
+        sheet_names: Optional[Dict[str, str]] = None,
+        mapping_mode: str = "flat",
+    ) -> Dict[str, str]:
+        """
+        Return the compiled CORE_GUIDE / TYPE_DEFINITIONS / VARIABLE_PATH_MAPPING blocks,
+        compiling the workbook only on a cache miss.
+
+        Args:
+            xlsx_path: Path to the rules workbook.
+            sheet_names: Optional sheet name overrides (see RulesCompiler.DEFAULT_SHEET_NAMES).
+            mapping_mode: "flat" or "trie" (see RulesCompiler.build_mapping_text).
+
+        Returns:
+            Dict with keys core_guide, type_definitions, variable_mapping.
+        """
+        return self.get_or_build(
+            "blocks",
+            xlsx_path,
+            sheet_names,
+            lambda: RulesCompiler(xlsx_path).compile_all(sheet_names, mapping_mode),
+            options={"mapping_mode": mapping_mode},
+        )
+
+    def get_or_build(
+        self,
+        artifact: str,
+        xlsx_path: str,
+        sheet_names: Optional[Dict[str, str]],
+        build: Callable[[], Any],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        Generic lookup for any JSON-serializable artifact derived from the workbook.
+
+        Args:
+            artifact: Artifact name (part of the key), e.g. "blocks".
+            xlsx_path: Path to the rules workbook.
+            sheet_names: Sheet names the artifact depends on.
+            build: Zero-arg callable producing the artifact on a miss.
+            options: Extra builder options that change the output (part of the key).
+        """
+        if not os.path.exists(xlsx_path):
+            raise FileNotFoundError(f"Rules workbook not found: {xlsx_path}")
+
+        key = self.make_key(artifact, xlsx_path, sheet_names, options)
+
+        # 1) In-process
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+
+        # 2) On disk
+        value = self._read_disk(key)
+
+        # 3) Compile
+        if value is None:
+            value = build()
+            self._write_disk(key, value)
+
+        with self._lock:
+            self._memory[key] = value
+        return value
+
+    def make_key(
+        self,
+        artifact: str,
+        xlsx_path: str,
+        sheet_names: Optional[Dict[str, str]] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Build the cache key for an artifact of the given workbook."""
+        names = {**RulesCompiler.DEFAULT_SHEET_NAMES, **(sheet_names or {})}
+        material = {
+            "artifact": artifact,
+            "workbook_sha256": self.workbook_hash(xlsx_path),
+            "sheet_names": names,
+            "compiler_version": RulesCompiler.COMPILER_VERSION,
+            "options": options or {},
+        }
+        raw = json.dumps(material, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def workbook_hash(cls, xlsx_path: str) -> str:
+        """
+        SHA-256 of the workbook bytes. The digest is memoized per (mtime, size),
+        so an unchanged file is never re-read within the process.
+        """
+        path = os.path.abspath(xlsx_path)
+        st = os.stat(path)
+        with cls._lock:
+            memo = cls._hash_memo.get(path)
+        if memo and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+            return memo[2]
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with cls._lock:
+            cls._hash_memo[path] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    @classmethod
+    def clear_memory(cls) -> None:
+        """Drop all in-process entries (on-disk entries are kept)."""
+        with cls._lock:
+            cls._memory.clear()
+            cls._hash_memo.clear()
+
+    # -------------------- Internal --------------------
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Any:
+        """Return the persisted value for key, or None on a miss / unreadable entry."""
+        if not self.cache_dir:
+            return None
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            data = FileReader.read_json(path)
+        except Exception:
+            return None
+        if not isinstance(data, dict) or data.get("key") != key:
+            return None
+        return data.get("value")
+
+    def _write_disk(self, key: str, value: Any) -> None:
+        """Persist an entry atomically (write to a temp file, then rename)."""
+        if not self.cache_dir:
+            return
+        path = self._entry_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            FileWriter.write_json({"key": key, "value": value}, tmp, pretty=False)
+            os.replace(tmp, path)
+        except OSError:
+            # A failed write only costs a recompile next time
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+if __name__ == "__main__":
+    import time
+
+    sample_path = "backend/src/rules/AUS_JS_Functions_From_Documentation.xlsx"
+    cache = RulesCache()
+
+    t0 = time.perf_counter()
+    cache.get_blocks(sample_path)
+    t1 = time.perf_counter()
+    cache.get_blocks(sample_path)
+    t2 = time.perf_counter()
+
+    print(f"first call:  {(t1 - t0) * 1000:.1f} ms")
+    print(f"second call: {(t2 - t1) * 1000:.1f} ms")
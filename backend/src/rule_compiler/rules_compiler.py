@@ -2,10 +2,12 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
-from typing import Dict, List
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
 import pandas as pd
 
-from backend.src.data_io.file_reader import FileReader
+from backend.src.data_io.file_reader import FileReader, XlsxSession
+from backend.src.rule_compiler.path_trie import PathTrie
 
 
 class RulesCompiler:
@@ -14,6 +16,33 @@ class RulesCompiler:
     from a .xlsx file into structured text blocks usable for LLM prompts.
     """
 
+    # Bump whenever the rendered output of any builder changes, so that
+    # persisted compile caches (see RulesCache) are invalidated.
+    COMPILER_VERSION = "1"
+
+    CORE_GUIDE_HEADER = (
+        "# CORE_GUIDE\n"
+        "This block summarizes allowed runtime APIs and usage notes. Use only what appears here."
+    )
+
+    HOUSE_RULES = (
+        "\n### House Rules\n"
+        "- Use `DataRequest` for repeated variable reads.\n"
+        "- Use `UnitCache` for per-unit intermediates; `GlobalCache` for shared values.\n"
+        "- Validate inputs; handle missing/null values safely.\n"
+        "- Write results via `Simulator.setData({ \"<Path>\": value })`.\n"
+        "- No external libraries, filesystem, or network calls."
+    )
+
+    # Preferred display order of mapping groups
+    MAPPING_ORDER = ["Tanks", "Streams", "Units", "Mixers", "FeedUnits", "Model", "Other"]
+
+    DEFAULT_SHEET_NAMES = {
+        "documentation": "Documentation",
+        "definitions": "TypeDefinitions.d.ts",
+        "mapping": "AUS mapping v14.6",
+    }
+
     def __init__(self, xlsx_path: str) -> None:
         """
         Args:
@@ -22,6 +51,39 @@ class RulesCompiler:
         if not os.path.exists(xlsx_path):
             raise FileNotFoundError(f"Rules workbook not found: {xlsx_path}")
         self.xlsx_path = xlsx_path
+        self._session: Optional[XlsxSession] = None
+
+    # -------------------------------------------------------------------------
+    # Workbook session
+    # -------------------------------------------------------------------------
+    def open(self) -> "RulesCompiler":
+        """
+        Open the workbook once; subsequent builder calls share the handle
+        instead of re-reading the file for every sheet.
+        """
+        if self._session is None:
+            self._session = FileReader.open_xlsx(self.xlsx_path)
+        return self
+
+    def close(self) -> None:
+        """Release the shared workbook handle (if open)."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def __enter__(self) -> "RulesCompiler":
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _read_sheet(self, sheet_name: str) -> pd.DataFrame:
+        """Read a sheet as strings (blank cells -> ""), via the shared handle when open."""
+        if self._session is not None:
+            df = self._session.read_sheet(sheet_name, header=None, dtype=str)
+        else:
+            df = FileReader.read_xlsx(self.xlsx_path, sheet_name=sheet_name, header=None, dtype=str)
+        return df.fillna("")
 
     # -------------------------------------------------------------------------
     # Sheet processors
@@ -36,91 +98,17 @@ class RulesCompiler:
         Returns:
             A formatted markdown text summarizing Simulator, UnitCache, and GlobalCache functions.
         """
-        df: pd.DataFrame = FileReader.read_xlsx(
-            self.xlsx_path, sheet_name=sheet_name, header=None, dtype=str
-        ).fillna("")
-        # Convert to list-of-lists (strings)
-        rows: List[List[str]] = [[self._clean_cell(x) for x in df.iloc[i].tolist()] for i in range(len(df))]
-
-        # 1) Find the real header row that contains both "Functions" and "Description"
-        header_idx = -1
-        for i, r in enumerate(rows):
-            joined = " | ".join(r).lower()
-            if "functions" in joined and "description" in joined:
-                header_idx = i
-                break
-
-        if header_idx == -1:
+        df: pd.DataFrame = self._clean_frame(self._read_sheet(sheet_name))
+        parsed = self._parse_documentation(df)
+        if parsed is None:
             # Fallback: flatten everything (keeps content rather than failing)
-            flat = "\n".join(["  ".join([c for c in r if c]) for r in rows if any(r)])
+            rows = df[(df != "").any(axis=1)].values.tolist()
+            flat = "\n".join(["  ".join([c for c in r if c]) for r in rows])
             return f"# CORE_GUIDE\n\n{flat}".strip()
 
-        header = rows[header_idx]
-
-        def col_idx(name: str) -> int:
-            for j, v in enumerate(header):
-                if name in (v or "").lower():
-                    return j
-            return -1
-
-        fn_i = col_idx("functions")
-        desc_i = col_idx("description")
-        par_i = col_idx("parameters")
-        ret_i = col_idx("returns")
-
-        out: List[str] = []
-        out.append("# CORE_GUIDE")
-        out.append("This block summarizes allowed runtime APIs and usage notes. Use only what appears here.")
-
-        current_section = "General"
-
-        # 2) Parse subsequent rows
-        for r in rows[header_idx + 1:]:
-            if not any(r):  # blank row
-                continue
-
-            # Section line: only first cell has content (others are empty) OR first cell contains "class of" and "functions"
-            first = r[0]
-            if (first and all(c == "" for c in r[1:])) or (
-                "class of" in first.lower() and "functions" in first.lower()
-            ):
-                # Trim noise like "Simulator class of functionsProvides access ..." -> keep up to "functions"
-                sec = first
-                if "functions" in first.lower():
-                    pos = first.lower().find("functions")
-                    if pos != -1:
-                        sec = first[:pos + len("functions")]
-                current_section = " ".join(sec.split()).strip().title()
-                out.append(f"\n## {current_section}")
-                continue
-
-            item_fn = self._get(r, fn_i)
-            item_desc = self._get(r, desc_i)
-            item_par = self._get(r, par_i)
-            item_ret = self._get(r, ret_i)
-
-            # Skip accidental duplicate header rows
-            if item_fn.lower() == "functions" and item_desc.lower() == "description":
-                continue
-            if not (item_fn or item_desc or item_par or item_ret):
-                continue
-
-            out.append(f"- **{item_fn}**")
-            if item_desc:
-                out.append(f"  - _Desc:_ {item_desc}")
-            if item_par:
-                out.append(f"  - _Params:_ {self._normalize_space(item_par)}")
-            if item_ret:
-                out.append(f"  - _Returns:_ {item_ret}")
-
-        out.append(
-            "\n### House Rules\n"
-            "- Use `DataRequest` for repeated variable reads.\n"
-            "- Use `UnitCache` for per-unit intermediates; `GlobalCache` for shared values.\n"
-            "- Validate inputs; handle missing/null values safely.\n"
-            "- Write results via `Simulator.setData({ \"<Path>\": value })`.\n"
-            "- No external libraries, filesystem, or network calls."
-        )
+        out: List[str] = [self.CORE_GUIDE_HEADER]
+        out.extend(parsed["text"].tolist())
+        out.append(self.HOUSE_RULES)
         return "\n".join(out)
 
     # -------------------------------------------------------------------------
@@ -131,86 +119,309 @@ class RulesCompiler:
         Returns:
             A string containing formatted TypeScript declarations (```ts fenced).
         """
-        df: pd.DataFrame = FileReader.read_xlsx(
-            self.xlsx_path, sheet_name=sheet_name, header=None, dtype=str
-        ).fillna("")
-        lines: List[str] = []
-        for _, row in df.iterrows():
-            cell = self._clean_cell(row.iloc[0] if df.shape[1] > 0 else "")
-            if cell:
-                lines.append(cell.replace("\r", ""))
-        ts = "\n".join(lines).strip()
+        ts = "\n".join(self._type_lines(sheet_name)).strip()
         return f"```ts\n{ts}\n```"
 
     # -------------------------------------------------------------------------
-    def build_mapping_text(self, sheet_name: str = "AUS mapping v14.6") -> str:
+    def build_mapping_text(self, sheet_name: str = "AUS mapping v14.6", mode: str = "flat") -> str:
         """
         Build a formatted mapping text from the AUS mapping sheet, grouped by top-level prefix
         (e.g., Tanks.*, Streams.*, Units.*, Mixers.*, FeedUnits.*, Model.*, Other).
 
+        Args:
+            sheet_name: Mapping sheet name.
+            mode: "flat" (one bullet per full path) or "trie" (nested prefix tree where
+                shared prefixes are written once; much fewer prompt tokens).
+
         Returns:
             A structured markdown text grouping variable paths.
         """
-        df: pd.DataFrame = FileReader.read_xlsx(
-            self.xlsx_path, sheet_name=sheet_name, header=None, dtype=str
-        ).fillna("")
+        return self._render_mapping(self._mapping_paths(sheet_name), mode)
 
-        raw: List[str] = []
-        for _, row in df.iterrows():
-            cell = self._clean_cell(row.iloc[0] if df.shape[1] > 0 else "")
-            if not cell:
-                continue
-            s = cell.strip().strip('"')
-            if s:
-                raw.append(s)
+    # -------------------------------------------------------------------------
+    # Item extraction (one entry per function / declaration / path)
+    # -------------------------------------------------------------------------
+    def extract_function_items(self, sheet_name: str = "Documentation") -> List[Dict[str, Any]]:
+        """
+        Split the 'Documentation' sheet into one item per documented function.
 
-        # Group by the top-level prefix (before first dot)
-        groups: Dict[str, List[str]] = {}
-        for p in raw:
-            top = p.split(".")[0] if "." in p else "Other"
-            groups.setdefault(top, []).append(p)
+        Returns:
+            List of {"kind": "function", "group": <section>, "name": <function>, "text": <markdown bullet>}.
+        """
+        parsed = self._parse_documentation(self._clean_frame(self._read_sheet(sheet_name)))
+        if parsed is None:
+            return []
+        items = parsed[~parsed["is_section"]]
+        return [
+            {"kind": "function", "group": g, "name": n, "text": t}
+            for g, n, t in zip(items["section"], items["name"], items["text"])
+        ]
+
+    def extract_type_items(self, sheet_name: str = "TypeDefinitions.d.ts") -> List[Dict[str, Any]]:
+        """
+        Split the TypeScript definitions into top-level declarations (leading comments
+        stay attached to the declaration that follows them).
 
-        # Preferred display order
-        order = ["Tanks", "Streams", "Units", "Mixers", "FeedUnits", "Model", "Other"]
-        keys = sorted(groups.keys(), key=lambda k: (order.index(k) if k in order else len(order), k))
+        Returns:
+            List of {"kind": "type", "group": "TypeDefinitions", "name": <first line>, "text": <declaration>}.
+        """
+        items: List[Dict[str, Any]] = []
+        chunk: List[str] = []
+        depth = 0
+        for line in self._type_lines(sheet_name):
+            chunk.append(line)
+            depth += line.count("{") - line.count("}")
+            code = line.strip()
+            is_comment = code.startswith(("//", "/*", "*"))
+            if depth <= 0 and not is_comment:
+                depth = 0
+                name = next((c.strip() for c in chunk if not c.strip().startswith(("//", "/*", "*"))), "")
+                items.append({"kind": "type", "group": "TypeDefinitions", "name": name, "text": "\n".join(chunk)})
+                chunk = []
+        if chunk:
+            items.append({"kind": "type", "group": "TypeDefinitions", "name": chunk[0].strip(), "text": "\n".join(chunk)})
+        return items
+
+    def extract_mapping_items(self, sheet_name: str = "AUS mapping v14.6") -> List[Dict[str, Any]]:
+        """
+        One item per distinct variable path of the AUS mapping sheet.
 
-        out: List[str] = []
-        out.append("# VARIABLE_PATH_MAPPING")
-        out.append("Use these path patterns; replace placeholders (e.g., <UnitName>, <StreamName>) with actual names.")
-        for k in keys:
-            out.append(f"\n## {k}")
-            for v in sorted(set(groups[k])):
-                out.append(f"- `{v}`")
-        return "\n".join(out)
+        Returns:
+            List of {"kind": "path", "group": <top-level prefix>, "name": <path>, "text": <path>}.
+        """
+        table = self._mapping_paths(sheet_name)
+        return [
+            {"kind": "path", "group": g, "name": p, "text": p}
+            for g, p in zip(table["top"], table["path"])
+        ]
 
-    # -------------------------------------------------------------------------
-    def compile_all(self) -> Dict[str, str]:
+    def extract_all_items(self, sheet_names: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
         """
-        Compile all sheets into a dictionary of text blocks.
+        Extract function, type and path items from all three sheets (one workbook pass).
+        """
+        names = {**self.DEFAULT_SHEET_NAMES, **(sheet_names or {})}
+        with self._shared_session():
+            return (
+                self.extract_function_items(names["documentation"])
+                + self.extract_type_items(names["definitions"])
+                + self.extract_mapping_items(names["mapping"])
+            )
+
+    @classmethod
+    def render_items(cls, items: List[Dict[str, Any]], mapping_mode: str = "flat") -> Dict[str, str]:
+        """
+        Render a subset of extracted items back into the three prompt blocks,
+        using the same layout as the full builders.
+
+        Args:
+            items: Items as returned by extract_*_items (any order, any subset).
+            mapping_mode: "flat" or "trie" (see build_mapping_text).
+
+        Returns:
+            Dict with keys core_guide, type_definitions, variable_mapping.
         """
+        functions = [it for it in items if it["kind"] == "function"]
+        types = [it for it in items if it["kind"] == "type"]
+        paths = [it for it in items if it["kind"] == "path"]
+
+        core: List[str] = [cls.CORE_GUIDE_HEADER]
+        sections: Dict[str, List[str]] = {}
+        for it in functions:
+            sections.setdefault(it["group"], []).append(it["text"])
+        for section, texts in sections.items():
+            core.append(f"\n## {section}")
+            core.extend(texts)
+        core.append(cls.HOUSE_RULES)
+
+        ts = "\n".join(it["text"] for it in types).strip()
+
+        top = pd.Series([it["group"] for it in paths], dtype=object)
+        path = pd.Series([it["name"] for it in paths], dtype=object)
         return {
-            "core_guide": self.build_core_guide_text(),
-            "type_definitions": self.build_type_definitions_text(),
-            "variable_mapping": self.build_mapping_text(),
+            "core_guide": "\n".join(core),
+            "type_definitions": f"```ts\n{ts}\n```",
+            "variable_mapping": cls._render_mapping(cls._sort_mapping(top, path), mapping_mode),
         }
 
+    # -------------------------------------------------------------------------
+    def compile_all(self, sheet_names: Optional[Dict[str, str]] = None, mapping_mode: str = "flat") -> Dict[str, str]:
+        """
+        Compile all sheets into a dictionary of text blocks.
+
+        Args:
+            sheet_names: Optional overrides for the "documentation", "definitions"
+                and "mapping" sheet names (see DEFAULT_SHEET_NAMES).
+            mapping_mode: "flat" or "trie" (see build_mapping_text).
+        """
+        names = {**self.DEFAULT_SHEET_NAMES, **(sheet_names or {})}
+        with self._shared_session():
+            return {
+                "core_guide": self.build_core_guide_text(names["documentation"]),
+                "type_definitions": self.build_type_definitions_text(names["definitions"]),
+                "variable_mapping": self.build_mapping_text(names["mapping"], mapping_mode),
+            }
+
     # ------------------------------ helpers ------------------------------
-    @staticmethod
-    def _clean_cell(v) -> str:
-        if pd.isna(v):
-            return ""
-        # Remove BOMs and normalize whitespace
-        return str(v).replace("\ufeff", "").strip()
+    @contextmanager
+    def _shared_session(self) -> Iterator[None]:
+        """Open the workbook once for several builders (unless the caller already did)."""
+        owns_session = self._session is None
+        if owns_session:
+            self.open()
+        try:
+            yield
+        finally:
+            if owns_session:
+                self.close()
+
+    def _parse_documentation(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """
+        Classify the rows of a cleaned 'Documentation' sheet.
+
+        Returns:
+            None if no "Functions"/"Description" header row exists; otherwise one row
+            per rendered line with columns is_section, section, name, text.
+        """
+        if df.shape[1] == 0:
+            df = pd.DataFrame({0: pd.Series([], dtype=object)})
+
+        lowered = df.apply(lambda col: col.str.lower())
+        non_blank = (df != "").any(axis=1)
+
+        # 1) Find the real header row that contains both "Functions" and "Description"
+        is_header = (
+            lowered.apply(lambda col: col.str.contains("functions", regex=False)).any(axis=1)
+            & lowered.apply(lambda col: col.str.contains("description", regex=False)).any(axis=1)
+        )
+        if not is_header.any():
+            return None
+
+        header_pos = int(is_header.values.argmax())
+        header = df.iloc[header_pos].tolist()
+
+        def col_idx(name: str) -> int:
+            for j, v in enumerate(header):
+                if name in (v or "").lower():
+                    return j
+            return -1
+
+        def column(idx: int, frame: pd.DataFrame) -> pd.Series:
+            if idx < 0:
+                return pd.Series("", index=frame.index, dtype=object)
+            return frame.iloc[:, idx]
+
+        fn_i = col_idx("functions")
+        desc_i = col_idx("description")
+        par_i = col_idx("parameters")
+        ret_i = col_idx("returns")
+
+        # 2) Classify every subsequent (non-blank) row at once
+        body = df.iloc[header_pos + 1:][non_blank.iloc[header_pos + 1:]]
+        first = body.iloc[:, 0]
+        first_lower = first.str.lower()
+        rest_empty = (body.iloc[:, 1:] == "").all(axis=1)
+
+        # Section line: only first cell has content (others are empty) OR first cell contains "class of" and "functions"
+        is_section = ((first != "") & rest_empty) | (
+            first_lower.str.contains("class of", regex=False)
+            & first_lower.str.contains("functions", regex=False)
+        )
+
+        # Trim noise like "Simulator class of functionsProvides access ..." -> keep up to "functions"
+        cut = first_lower.str.find("functions")
+        sec = pd.Series(
+            [f[:p + len("functions")] if p != -1 else f for f, p in zip(first, cut)],
+            index=body.index,
+            dtype=object,
+        )
+        sec_title = sec.str.split().str.join(" ").str.strip().str.title()
+
+        item_fn = column(fn_i, body)
+        item_desc = column(desc_i, body)
+        item_par = column(par_i, body).str.replace("\r", "", regex=False).str.split().str.join(" ")
+        item_ret = column(ret_i, body)
+
+        # Skip accidental duplicate header rows and fully empty items
+        is_dup_header = (item_fn.str.lower() == "functions") & (item_desc.str.lower() == "description")
+        is_empty = (item_fn == "") & (item_desc == "") & (item_par == "") & (item_ret == "")
+        is_item = ~is_section & ~is_dup_header & ~is_empty
+
+        item_text = (
+            "- **" + item_fn + "**"
+            + ("\n  - _Desc:_ " + item_desc).where(item_desc != "", "")
+            + ("\n  - _Params:_ " + item_par).where(item_par != "", "")
+            + ("\n  - _Returns:_ " + item_ret).where(item_ret != "", "")
+        )
+
+        keep = is_section | is_item
+        return pd.DataFrame({
+            "is_section": is_section,
+            "section": sec_title.where(is_section).ffill().fillna("General"),
+            "name": item_fn,
+            "text": ("\n## " + sec_title).where(is_section, item_text),
+        })[keep]
+
+    def _type_lines(self, sheet_name: str) -> List[str]:
+        """Non-empty, cleaned lines of the TypeScript definitions sheet."""
+        cells = self._first_column(self._read_sheet(sheet_name))
+        return cells[cells != ""].str.replace("\r", "", regex=False).tolist()
+
+    def _mapping_paths(self, sheet_name: str) -> pd.DataFrame:
+        """Distinct mapping paths with their top-level prefix, in display order."""
+        cells = self._first_column(self._read_sheet(sheet_name)).str.strip().str.strip('"')
+        paths = cells[cells != ""]
+
+        # Group by the top-level prefix (before first dot)
+        top = paths.str.split(".", n=1).str[0].where(paths.str.contains(".", regex=False), "Other")
+        return self._sort_mapping(top, paths)
+
+    @classmethod
+    def _sort_mapping(cls, top: pd.Series, paths: pd.Series) -> pd.DataFrame:
+        """Dedup (top, path) pairs and sort them by preferred group order, group, path."""
+        rank = top.map({k: i for i, k in enumerate(cls.MAPPING_ORDER)}).fillna(len(cls.MAPPING_ORDER)).astype(int)
+        return (
+            pd.DataFrame({"rank": rank, "top": top, "path": paths})
+            .drop_duplicates(subset=["top", "path"])
+            .sort_values(["rank", "top", "path"], kind="mergesort")
+        )
 
     @staticmethod
-    def _get(row: List[str], idx: int) -> str:
-        if idx < 0 or idx >= len(row):
-            return ""
-        return (row[idx] or "").strip()
+    def _render_mapping(table: pd.DataFrame, mode: str = "flat") -> str:
+        if mode not in ("flat", "trie"):
+            raise ValueError(f"Unknown mapping mode: {mode!r} (expected 'flat' or 'trie')")
+
+        out: List[str] = []
+        out.append("# VARIABLE_PATH_MAPPING")
+        out.append("Use these path patterns; replace placeholders (e.g., <UnitName>, <StreamName>) with actual names.")
+        if mode == "trie":
+            out.append(
+                "Paths are shown as a prefix tree: each indented line continues its parent path with `.`, "
+                "`{A | B}` means any one of the alternatives and `[...]` marks an optional suffix."
+            )
+            trie = PathTrie.from_paths(table["path"])
+            for top, group in table.groupby("top", sort=False):
+                out.append(f"\n## {top}")
+                if top == "Other":
+                    out.extend(f"- `{p}`" for p in group["path"])
+                else:
+                    out.extend(trie.render_lines(top))
+        elif not table.empty:
+            group_start = table["top"] != table["top"].shift()
+            heading = ("\n## " + table["top"] + "\n").where(group_start, "")
+            out.extend((heading + "- `" + table["path"] + "`").tolist())
+        return "\n".join(out)
 
     @staticmethod
-    def _normalize_space(s: str) -> str:
-        return " ".join((s or "").replace("\r", "").split())
+    def _clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Column-wise cell cleaning: stringify, remove BOMs and strip surrounding whitespace."""
+        return df.apply(lambda col: col.astype(str).str.replace("\ufeff", "", regex=False).str.strip())
+
+    @classmethod
+    def _first_column(cls, df: pd.DataFrame) -> pd.Series:
+        """Cleaned first column of a sheet (empty Series for a sheet without columns)."""
+        if df.shape[1] == 0:
+            return pd.Series([], dtype=object)
+        return cls._clean_frame(df.iloc[:, [0]]).iloc[:, 0]
 
 
 if __name__ == "__main__":
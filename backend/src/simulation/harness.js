@@ -0,0 +1,230 @@
+// Local mock runtime for AUS custom unit modules.
+//
+// Protocol: one JSON request per line on stdin, one JSON response per line on stdout.
+//   {"id": 1, "cmd": "load",  "module": "LPX2", "code": "..."}
+//   {"id": 2, "cmd": "run",   "module": "LPX2", "periods": [{...}, ...], "initial": {...}}
+//   {"id": 3, "cmd": "reset", "module": "LPX2"}          (omit module to reset all)
+// Every response is {"id", "ok": true, ...} or {"id", "ok": false, "error": "..."}.
+//
+// A module is compiled once and runs in its own vm context. UnitCache lives per
+// module and GlobalCache per process, both across periods (as in AUS), so a
+// DataRequest built inside UnitCache.getOrSet is built once and executed every period.
+//
+// Not a security boundary: the vm module only separates globals. The mock objects
+// are created in this (host) realm, so module code can reach the real `process`
+// through them (e.g. `Log.info.constructor("return process")()`). Only run modules
+// you would run with plain `node`; untrusted code needs a separate sandbox or
+// container around this whole process.
+
+"use strict";
+
+const vm = require("vm");
+const readline = require("readline");
+
+const globalCache = new Map();
+const modules = new Map();
+
+// Copy a value so later mutations by the module do not change recorded writes
+function snapshot(value) {
+    if (value === undefined) {
+        return null;
+    }
+    try {
+        return JSON.parse(JSON.stringify(value));
+    } catch (e) {
+        return String(value);
+    }
+}
+
+function makeCache(store) {
+    return {
+        getOrSet(key, create) {
+            if (!store.has(key)) {
+                store.set(key, create());
+            }
+            return store.get(key);
+        },
+        get(key) {
+            return store.get(key);
+        },
+        set(key, value) {
+            store.set(key, value);
+        },
+        has(key) {
+            return store.has(key);
+        },
+        delete(key) {
+            return store.delete(key);
+        },
+        clear() {
+            store.clear();
+        },
+    };
+}
+
+// Runtime state of one module: compiled entry point, sandbox, unit cache and variable store
+function createModule(name, code, timeoutMs) {
+    const state = { data: new Map(), period: null, unitCache: new Map() };
+    const read = (path) => {
+        if (!state.data.has(path)) {
+            state.period.missing.add(path);
+            return undefined;
+        }
+        return state.data.get(path);
+    };
+    const log = (level) => (...args) => {
+        state.period.logs.push({ level: level, message: args.map(String).join(" ") });
+    };
+
+    class DataRequest {
+        constructor(key, build) {
+            this.key = key;
+            this.build = build;
+            this.paths = null;
+        }
+
+        execute() {
+            // Built on first use: build() may refer to the object the request is stored in
+            if (this.paths === null) {
+                this.paths = this.build();
+            }
+            state.period.requests.push(this.key);
+            const result = {};
+            for (const path of this.paths) {
+                result[path] = read(path);
+            }
+            return result;
+        }
+    }
+
+    const Simulator = {
+        getData(paths) {
+            if (Array.isArray(paths)) {
+                const result = {};
+                for (const path of paths) {
+                    result[path] = read(path);
+                }
+                return result;
+            }
+            return read(paths);
+        },
+        setData(data) {
+            const write = snapshot(data) || {};
+            state.period.writes.push(write);
+            // Written variables are visible to later reads (same and following periods)
+            for (const path of Object.keys(write)) {
+                state.data.set(path, write[path]);
+            }
+        },
+    };
+
+    const Log = {
+        debug: log("debug"),
+        info: log("info"),
+        warning: log("warning"),
+        warn: log("warning"),
+        error: log("error"),
+    };
+
+    const sandbox = {
+        Simulator: Simulator,
+        DataRequest: DataRequest,
+        UnitCache: makeCache(state.unitCache),
+        GlobalCache: makeCache(globalCache),
+        Log: Log,
+        console: { log: log("console"), info: log("console"), warn: log("console"), error: log("console") },
+    };
+    // Promise callbacks run before runInContext returns, so the period timeout covers them too
+    const context = vm.createContext(sandbox, { microtaskMode: "afterEvaluate" });
+    // Wrapped in a function so the top-level const/let of the module can run every period
+    const script = new vm.Script(`(function () {\n${code}\n})`, { filename: name, lineOffset: -1 });
+    const entry = script.runInContext(context);
+    return { name: name, entry: entry, state: state, timeoutMs: timeoutMs, context: context };
+}
+
+function errorLine(err, name) {
+    const stack = String((err && err.stack) || "");
+    const marker = `${name}:`;
+    const at = stack.indexOf(marker);
+    if (at < 0) {
+        return null;
+    }
+    const line = parseInt(stack.slice(at + marker.length), 10);
+    return Number.isNaN(line) ? null : line;
+}
+
+function runPeriods(mod, periods, initial) {
+    const state = mod.state;
+    for (const path of Object.keys(initial || {})) {
+        state.data.set(path, initial[path]);
+    }
+    const caller = new vm.Script("__entry__()", { filename: "harness" });
+    mod.context.__entry__ = mod.entry;
+    const results = [];
+    for (const fixture of periods) {
+        for (const path of Object.keys(fixture || {})) {
+            state.data.set(path, fixture[path]);
+        }
+        state.period = { writes: [], logs: [], requests: [], missing: new Set() };
+        let error = null;
+        try {
+            // The timeout only applies to code started via runInContext
+            caller.runInContext(mod.context, { timeout: mod.timeoutMs });
+        } catch (err) {
+            error = { message: String((err && err.message) || err), line: errorLine(err, mod.name) };
+        }
+        results.push({
+            writes: state.period.writes,
+            logs: state.period.logs,
+            requests: state.period.requests,
+            missing: Array.from(state.period.missing).sort(),
+            error: error,
+        });
+    }
+    state.period = null;
+    return results;
+}
+
+function handle(request) {
+    if (request.cmd === "load") {
+        modules.set(request.module, createModule(request.module, request.code, request.timeout_ms || 1000));
+        return {};
+    }
+    if (request.cmd === "run") {
+        const mod = modules.get(request.module);
+        if (!mod) {
+            throw new Error(`module not loaded: ${request.module}`);
+        }
+        return { periods: runPeriods(mod, request.periods || [], request.initial) };
+    }
+    if (request.cmd === "reset") {
+        const targets = request.module === undefined ? Array.from(modules.values()) : [modules.get(request.module)];
+        for (const mod of targets) {
+            if (mod) {
+                mod.state.data.clear();
+                mod.state.unitCache.clear();
+            }
+        }
+        if (request.module === undefined) {
+            globalCache.clear();
+        }
+        return {};
+    }
+    throw new Error(`unknown command: ${request.cmd}`);
+}
+
+const input = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+input.on("line", (line) => {
+    if (!line.trim()) {
+        return;
+    }
+    let request = {};
+    let response;
+    try {
+        request = JSON.parse(line);
+        response = { id: request.id, ok: true, ...handle(request) };
+    } catch (err) {
+        response = { id: request.id, ok: false, error: String((err && err.stack) || err) };
+    }
+    process.stdout.write(JSON.stringify(response) + "\n");
+});
@@ -0,0 +1,263 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import json
+import time
+import queue
+import shutil
+import argparse
+import threading
+import subprocess
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from backend.src.data_io.file_reader import FileReader
+from backend.src.data_io.file_writer import FileWriter
+from backend.src.query.code_patch import CodePatcher
+
+
+class ModuleRuntime:
+    """
+    Offline runner for AUS custom unit modules (generated or from the library).
+
+    Starts one Node.js process with harness.js, which provides mock Simulator /
+    DataRequest / UnitCache / GlobalCache / Log objects. Modules are compiled once
+    and then executed for any number of simulation periods in that process; each
+    period's variables come from fixture data. Per period the result holds:
+      - writes:   every Simulator.setData(...) payload, in call order,
+      - logs:     Log.* / console messages as {"level", "message"},
+      - requests: keys of the executed DataRequests,
+      - missing:  variable paths read but absent from the fixture,
+      - error:    {"message", "line"} if the module threw, else None.
+
+    Variables persist across periods: a period's fixture only overrides the paths
+    it lists, and written variables are visible to later reads.
+
+    Fixture files are JSON: {"initial": {path: value}, "periods": [{path: value}, ...]}.
+
+    Each request waits at most timeout_ms per period plus REQUEST_SLACK seconds for
+    the harness; past that the Node.js process is killed (and started again on the
+    next request). Its stderr is kept and quoted when it exits or times out.
+
+    Not a sandbox: Node's vm module only separates globals, and module code can reach
+    the harness process (and so the file system and network) through the mock
+    objects. Run only code you would run with plain `node`; untrusted modules need a
+    separate sandbox or container around the harness.
+
+    Typical usage:
+      with ModuleRuntime() as runtime:
+          runtime.load("LPX2", code)
+          results = runtime.run("LPX2", fixture["periods"], initial=fixture.get("initial"))
+          writes = ModuleRuntime.merged_writes(results[0])
+    """
+
+    HARNESS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "harness.js")
+    # Seconds allowed per request on top of the period timeouts (process start, compile, IPC)
+    REQUEST_SLACK = 5.0
+    # Last stderr lines kept for error messages
+    STDERR_LINES = 50
+
+    def __init__(self, node: str = "node", timeout_ms: int = 1000) -> None:
+        """
+        Args:
+            node: Node.js executable (name on PATH or full path).
+            timeout_ms: Maximum run time of one module period before it is aborted.
+        """
+        self.node = node
+        self.timeout_ms = int(timeout_ms)
+        self._proc: Optional[subprocess.Popen] = None
+        self._responses: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._stderr: deque = deque(maxlen=self.STDERR_LINES)
+        self._stderr_reader: Optional[threading.Thread] = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def available(cls, node: str = "node") -> bool:
+        """True if the Node.js executable can be found."""
+        return shutil.which(node) is not None
+
+    def __enter__(self) -> "ModuleRuntime":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # -------------------- Public APIs --------------------
+    def load(self, name: str, code: str) -> None:
+        """
+        Compile a module (a fenced reply is accepted too); loading an existing name replaces it.
+
+        Raises:
+            RuntimeError: If the module does not compile.
+        """
+        code = CodePatcher.extract_code(code) or code
+        self._request({"cmd": "load", "module": name, "code": code, "timeout_ms": self.timeout_ms}, periods=1)
+
+    def load_file(self, js_path: str, name: Optional[str] = None) -> str:
+        """Load a .js file; returns the module name (file stem by default)."""
+        name = name or os.path.splitext(os.path.basename(js_path))[0]
+        self.load(name, FileReader.read_text(js_path))
+        return name
+
+    def run(
+        self,
+        name: str,
+        periods: List[Dict[str, Any]],
+        initial: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute a loaded module once per period.
+
+        Args:
+            name: Module name given to load().
+            periods: Fixture data per period ({variable path: value}).
+            initial: Variables set once before the first period.
+
+        Returns:
+            One result dict per period (see the class docstring).
+        """
+        response = self._request(
+            {"cmd": "run", "module": name, "periods": periods, "initial": initial or {}},
+            periods=len(periods),
+        )
+        return response["periods"]
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Drop variables and UnitCache of a module (all modules and GlobalCache when name is None)."""
+        request: Dict[str, Any] = {"cmd": "reset"}
+        if name is not None:
+            request["module"] = name
+        self._request(request)
+
+    def close(self) -> None:
+        """Stop the Node.js process (started again on the next request)."""
+        with self._lock:
+            proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+
+    @staticmethod
+    def read_fixture(path: str) -> Dict[str, Any]:
+        """Read a fixture file; a bare list is taken as the periods."""
+        data = FileReader.read_json(path)
+        if isinstance(data, list):
+            return {"initial": {}, "periods": data}
+        return {"initial": data.get("initial") or {}, "periods": data.get("periods") or []}
+
+    @staticmethod
+    def merged_writes(result: Dict[str, Any]) -> Dict[str, Any]:
+        """All setData writes of one period as one {path: value} dict (later calls win)."""
+        merged: Dict[str, Any] = {}
+        for write in result["writes"]:
+            merged.update(write)
+        return merged
+
+    # ------------------------------ helpers ------------------------------
+    def _ensure_started(self) -> subprocess.Popen:
+        if self._proc is not None and self._proc.poll() is None:
+            return self._proc
+        if not self.available(self.node):
+            raise RuntimeError(f"Node.js executable not found: {self.node}")
+        self._proc = subprocess.Popen(
+            [self.node, self.HARNESS_PATH],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        # Fresh queue / buffer per process so nothing from a killed one leaks into the next
+        self._responses = queue.Queue()
+        self._stderr = deque(maxlen=self.STDERR_LINES)
+        stdout_reader = threading.Thread(target=self._pump, args=(self._proc.stdout, self._responses.put), daemon=True)
+        self._stderr_reader = threading.Thread(target=self._pump, args=(self._proc.stderr, self._stderr.append), daemon=True)
+        stdout_reader.start()
+        self._stderr_reader.start()
+        return self._proc
+
+    @staticmethod
+    def _pump(stream, sink) -> None:
+        """Forward lines of a pipe to sink; None marks the end of stdout."""
+        try:
+            for line in stream:
+                sink(line)
+        except (OSError, ValueError):
+            pass
+        sink(None)
+
+    def _request(self, request: Dict[str, Any], periods: int = 0) -> Dict[str, Any]:
+        timeout = self.timeout_ms * max(1, periods) / 1000.0 + self.REQUEST_SLACK
+        with self._lock:
+            proc = self._ensure_started()
+            responses = self._responses
+            self._next_id += 1
+            request["id"] = self._next_id
+            try:
+                proc.stdin.write(json.dumps(request, ensure_ascii=False) + "\n")
+                proc.stdin.flush()
+                line = responses.get(timeout=timeout)
+            except (BrokenPipeError, OSError) as e:
+                self._proc = None
+                raise RuntimeError(f"Simulation harness stopped: {e}{self._stderr_tail(proc)}")
+            except queue.Empty:
+                # Stuck outside the vm timeout (e.g. a runaway loop the harness cannot interrupt)
+                self._proc = None
+                proc.kill()
+                raise RuntimeError(f"Simulation harness did not answer within {timeout:.1f}s and was stopped"
+                                   f"{self._stderr_tail(proc)}")
+            if not line:
+                self._proc = None
+                raise RuntimeError(f"Simulation harness exited with code {proc.wait()}{self._stderr_tail(proc)}")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise RuntimeError(f"Simulation harness error: {response.get('error')}")
+        return response
+
+    def _stderr_tail(self, proc: subprocess.Popen) -> str:
+        """Last stderr lines of an ended process, for error messages."""
+        try:
+            proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        if self._stderr_reader is not None:
+            self._stderr_reader.join(timeout=1)
+        lines = [line for line in self._stderr if line]
+        return ("\nstderr:\n" + "".join(lines).rstrip()) if lines else ""
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an AUS module against fixture data in the mock runtime.")
+    parser.add_argument("module", help="Module .js file.")
+    parser.add_argument("fixture", help="Fixture .json file ({'initial': {...}, 'periods': [...]}).")
+    parser.add_argument("--repeat", type=int, default=1, help="Run the fixture periods this many times.")
+    parser.add_argument("--out", default=None, help="Write one JSON line per period result to this file.")
+    args = parser.parse_args()
+
+    fixture = ModuleRuntime.read_fixture(args.fixture)
+    periods = fixture["periods"] * args.repeat
+    with ModuleRuntime() as runtime:
+        name = runtime.load_file(args.module)
+        started = time.perf_counter()
+        results = runtime.run(name, periods, initial=fixture["initial"])
+        seconds = time.perf_counter() - started
+
+    if args.out:
+        FileWriter.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in results), args.out)
+    errors = [i for i, r in enumerate(results) if r["error"]]
+    print(json.dumps({
+        "module": name,
+        "periods": len(results),
+        "writes": sum(len(ModuleRuntime.merged_writes(r)) for r in results),
+        "errors": len(errors),
+        "first_error": results[errors[0]]["error"] if errors else None,
+        "missing": sorted({p for r in results for p in r["missing"]}),
+        "seconds": round(seconds, 3),
+    }, ensure_ascii=False))
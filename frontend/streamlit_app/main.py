@@ -3,10 +3,56 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 import uuid
+import threading
 import streamlit as st
 
 from backend.src.query.user_query_runner import UserQueryRunner
 from backend.src.query.conversation_manager import ConversationManager
+from backend.src.llm.copilot_client import CopilotClient
+from backend.src.llm.response_cache import ResponseCache
+from backend.src.query.session_store import SqliteSessionStore
+from backend.src.library.example_library import ExampleLibrary
+
+
+@st.cache_resource
+def get_session_store() -> SqliteSessionStore:
+    """One SQLite session store per server process, shared by all browser sessions."""
+    return SqliteSessionStore()
+
+
+@st.cache_resource
+def get_copilot_client() -> CopilotClient:
+    """
+    One client per server process (config read once, pooled HTTP connections).
+    Response cache: reloads / "Clear Chat" + re-ask of the same prompt skip the round trip.
+    """
+    return CopilotClient(cache=ResponseCache())
+
+
+@st.cache_resource
+def get_prompt_runner() -> UserQueryRunner:
+    """
+    One prompt builder per server process; compiled rules and templates live in process-wide caches.
+    The most similar modules of the example library are added as few-shot examples.
+    """
+    return UserQueryRunner(copilot=get_copilot_client(), example_library=ExampleLibrary.shared())
+
+
+@st.cache_resource
+def start_warmup(_runner: UserQueryRunner, rules_xlsx: str, system_txt: str, user_txt: str) -> threading.Thread:
+    """
+    Compile the rules workbook and prompt templates in a background thread as soon
+    as the app starts (once per set of paths), so the first turn only renders the query.
+    """
+    def warm() -> None:
+        try:
+            _runner.warm(rules_xlsx, system_txt, user_txt)
+        except Exception:
+            pass  # the first turn builds the prompts itself and reports the error
+
+    thread = threading.Thread(target=warm, name="prompt-warmup", daemon=True)
+    thread.start()
+    return thread
 
 
 def run_demo():
@@ -28,6 +74,12 @@ def run_demo():
         value="backend/src/prompts/user.prompt.code.refinery.txt"
     )
 
+    # ---------- Warm shared resources (no-op after the first run per paths) ----------
+    try:
+        warmup = start_warmup(get_prompt_runner(), rules_xlsx, system_txt, user_txt)
+    except Exception:
+        warmup = None  # e.g. missing API key: reported on the first turn
+
     if st.sidebar.button("Clear Chat", type="secondary"):
         for k in ["messages", "initialized", "cm", "runner", "session_id"]:
             if k in st.session_state:
@@ -68,19 +120,25 @@ def run_demo():
     # ---------- First turn vs subsequent turns ----------
     try:
         if not st.session_state.initialized:
-            # First turn: compile rules, build prompts, start conversation
-            runner = UserQueryRunner()
+            # First turn: build prompts (rules / templates already warm), start conversation
+            runner = get_prompt_runner()
+            if warmup is not None:
+                warmup.join()  # still compiling: wait instead of compiling twice
             system_prompt, user_prompt = runner.build_prompts(
                 rules_xlsx_path=rules_xlsx,
                 system_prompt_path=system_txt,
                 user_prompt_path=user_txt,
                 user_query=prompt,
             )
-            cm = ConversationManager(session_id=st.session_state.session_id)
+            cm = ConversationManager(
+                session_id=st.session_state.session_id,
+                copilot=get_copilot_client(),
+                store=get_session_store(),
+            )
 
+            # Stream tokens into the chat bubble as they arrive
             with st.chat_message("assistant"):
-                with st.spinner("Calling Copilot..."):
-                    reply = cm.start_with(system_prompt, user_prompt)
+                reply = st.write_stream(cm.start_with_stream(system_prompt, user_prompt))
 
             # Persist for later turns
             st.session_state.initialized = True
@@ -90,13 +148,10 @@ def run_demo():
             # Subsequent turns: continue the same thread
             cm: ConversationManager = st.session_state.cm
             with st.chat_message("assistant"):
-                with st.spinner("Calling Copilot..."):
-                    reply = cm.continue_with(prompt)
+                reply = st.write_stream(cm.continue_with_stream(prompt))
 
-        # Render assistant reply & add to history
+        # Add the (already rendered) assistant reply to history
         st.session_state.messages.append({"role": "assistant", "content": reply})
-        with st.chat_message("assistant"):
-            st.markdown(reply)
 
         # Rerun so the new messages appear above and the input stays at bottom
         st.rerun()
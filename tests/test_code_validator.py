@@ -0,0 +1,40 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from backend.src.query.code_validator import CodeValidator
+from backend.src.rule_compiler.rules_compiler import RulesCompiler
+from tests.test_rules_compiler import _write_workbook
+
+
+@pytest.fixture(scope="module")
+def validator(tmp_path_factory) -> CodeValidator:
+    path = str(tmp_path_factory.mktemp("rules") / "rules.xlsx")
+    _write_workbook(path)
+    return CodeValidator(RulesCompiler(path).extract_all_items())
+
+
+def test_one_line_declaration_indexes_its_methods(validator):
+    # "declare class Log { static warning(message: string): void; }" is a single row
+    assert validator.methods["log"] == {"warning"}
+    findings = validator.validate('Log.warning("low level");\nLog.error("oops");')
+    assert [f["item"] for f in findings] == ["Log.error"]
+
+
+def test_multi_line_declaration_indexes_its_methods(validator):
+    assert validator.methods["simulator"] == {"getData", "setData"}
+
+
+def test_only_class_headings_own_functions():
+    validator = CodeValidator([
+        {"kind": "function", "group": "Simulator Class Of Functions", "name": "getData(path)", "text": ""},
+        {"kind": "function", "group": "Misc Helpers", "name": "clamp(value, lo, hi)", "text": ""},
+        {"kind": "function", "group": "General", "name": "round(value)", "text": ""},
+    ])
+    assert set(validator.classes) == {"simulator"}
+    # Functions from non-class sections are accepted on every known object
+    assert validator.methods["simulator"] == {"getData", "clamp", "round"}
+    findings = validator.validate("Misc.clamp(1, 0, 2);\nSimulator.clamp(1, 0, 2);")
+    assert [(f["item"], f["line"]) for f in findings] == [("Misc.clamp", 1)]
@@ -0,0 +1,201 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from openpyxl import Workbook
+
+from backend.src.rule_compiler.rules_compiler import RulesCompiler
+
+
+# Golden outputs below were captured from the original row-by-row builders (baseline
+# implementation) on the workbook written by _write_workbook; the vectorized builders
+# must keep producing them byte for byte.
+
+def _write_workbook(path: str) -> None:
+    wb = Workbook()
+
+    doc = wb.active
+    doc.title = "Documentation"
+    for row in [
+        ["\ufeffAUS scripting reference", None, None, None],
+        [None, None, None, None],
+        ["Functions", "Description", "Parameters", "Returns"],
+        ["Simulator class of functionsProvides access to model data", "ignored", None, None],
+        ["getData(path)", "Read a variable\r\nvalue", "path: string\r\n  the variable path", "any"],
+        ["\ufeffsetData(data)", "  Write variables  ", "data: { [key: string]: any }", None],
+        [None, None, None, None],
+        ["Functions", "Description", None, None],
+        ["UnitCache   Class Of Functions", None, None, None],
+        ["getOrSet(key, create)", "Get or create a cached value", "key: string,\n create: () => any", 42],
+        [None, "Description only", None, None],
+        [None, None, None, 3.5],
+        ["Misc helpers", None, None, None],
+        [7, "Numeric function name", None, None],
+    ]:
+        doc.append(row)
+
+    flat = wb.create_sheet("NoHeader")
+    for row in [
+        ["\ufeffJust notes", None, "more"],
+        [None, None, None],
+        [None, 12, "x\r\ny"],
+    ]:
+        flat.append(row)
+
+    types = wb.create_sheet("TypeDefinitions.d.ts")
+    for row in [
+        ["\ufeffdeclare class Simulator {"],
+        ["  static getData(path: string): any;\r\n  static setData(data: object): void;"],
+        [None],
+        ["}"],
+        [""],
+        [123],
+        ["declare class Log { static warning(message: string): void; }  "],
+    ]:
+        types.append(row)
+
+    mapping = wb.create_sheet("AUS mapping v14.6")
+    for row in [
+        ["Units.<UnitName>.Parameters"],
+        ["\ufeff\"Streams.<StreamName>.Volume\""],
+        ["Tanks.<TankName>.Level"],
+        ["Streams.<StreamName>.Volume"],
+        [None],
+        ["Units.<UnitName>.Parameters"],
+        ["Model.PeriodStart"],
+        ["Pipes.<PipeName>.Flow"],
+        ["   \"  \"  "],
+        ["StandaloneName"],
+        [3.14],
+        ["Mixers.<MixerName>.Ratio\r\n"],
+        ["Streams.<StreamName>.Mass"],
+        ["FeedUnits.<FeedUnitName>.Rate"],
+        ["Alpha.<X>.Y"],
+    ]:
+        mapping.append(row)
+
+    wb.save(path)
+
+
+GOLDEN_CORE_GUIDE = (
+    '# CORE_GUIDE\n'
+    'This block summarizes allowed runtime APIs and usage notes. Use only what appears here.\n'
+    '\n'
+    '## Simulator Class Of Functions\n'
+    '- **getData(path)**\n'
+    '  - _Desc:_ Read a variable\n'
+    'value\n'
+    '  - _Params:_ path: string the variable path\n'
+    '  - _Returns:_ any\n'
+    '- **setData(data)**\n'
+    '  - _Desc:_ Write variables\n'
+    '  - _Params:_ data: { [key: string]: any }\n'
+    '\n'
+    '## Unitcache Class Of Functions\n'
+    '- **getOrSet(key, create)**\n'
+    '  - _Desc:_ Get or create a cached value\n'
+    '  - _Params:_ key: string, create: () => any\n'
+    '  - _Returns:_ 42\n'
+    '- ****\n'
+    '  - _Desc:_ Description only\n'
+    '- ****\n'
+    '  - _Returns:_ 3.5\n'
+    '\n'
+    '## Misc Helpers\n'
+    '- **7**\n'
+    '  - _Desc:_ Numeric function name\n'
+    '\n'
+    '### House Rules\n'
+    '- Use `DataRequest` for repeated variable reads.\n'
+    '- Use `UnitCache` for per-unit intermediates; `GlobalCache` for shared values.\n'
+    '- Validate inputs; handle missing/null values safely.\n'
+    '- Write results via `Simulator.setData({ "<Path>": value })`.\n'
+    '- No external libraries, filesystem, or network calls.'
+)
+
+GOLDEN_CORE_GUIDE_FALLBACK = (
+    '# CORE_GUIDE\n'
+    '\n'
+    'Just notes  more\n'
+    '12  x\n'
+    'y'
+)
+
+GOLDEN_TYPE_DEFINITIONS = (
+    '```ts\n'
+    'declare class Simulator {\n'
+    'static getData(path: string): any;\n'
+    '  static setData(data: object): void;\n'
+    '}\n'
+    '123\n'
+    'declare class Log { static warning(message: string): void; }\n'
+    '```'
+)
+
+GOLDEN_MAPPING = (
+    '# VARIABLE_PATH_MAPPING\n'
+    'Use these path patterns; replace placeholders (e.g., <UnitName>, <StreamName>) with actual names.\n'
+    '\n'
+    '## Tanks\n'
+    '- `Tanks.<TankName>.Level`\n'
+    '\n'
+    '## Streams\n'
+    '- `Streams.<StreamName>.Mass`\n'
+    '- `Streams.<StreamName>.Volume`\n'
+    '\n'
+    '## Units\n'
+    '- `Units.<UnitName>.Parameters`\n'
+    '\n'
+    '## Mixers\n'
+    '- `Mixers.<MixerName>.Ratio`\n'
+    '\n'
+    '## FeedUnits\n'
+    '- `FeedUnits.<FeedUnitName>.Rate`\n'
+    '\n'
+    '## Model\n'
+    '- `Model.PeriodStart`\n'
+    '\n'
+    '## Other\n'
+    '- `  `\n'
+    '- `StandaloneName`\n'
+    '\n'
+    '## 3\n'
+    '- `3.14`\n'
+    '\n'
+    '## Alpha\n'
+    '- `Alpha.<X>.Y`\n'
+    '\n'
+    '## Pipes\n'
+    '- `Pipes.<PipeName>.Flow`'
+)
+
+
+@pytest.fixture(scope="module")
+def compiler(tmp_path_factory) -> RulesCompiler:
+    path = str(tmp_path_factory.mktemp("rules") / "rules.xlsx")
+    _write_workbook(path)
+    return RulesCompiler(path)
+
+
+def test_core_guide_matches_baseline(compiler):
+    assert compiler.build_core_guide_text() == GOLDEN_CORE_GUIDE
+
+
+def test_core_guide_fallback_matches_baseline(compiler):
+    assert compiler.build_core_guide_text("NoHeader") == GOLDEN_CORE_GUIDE_FALLBACK
+
+
+def test_type_definitions_match_baseline(compiler):
+    assert compiler.build_type_definitions_text() == GOLDEN_TYPE_DEFINITIONS
+
+
+def test_mapping_matches_baseline(compiler):
+    assert compiler.build_mapping_text() == GOLDEN_MAPPING
+
+
+def test_shared_handle_gives_same_output(compiler):
+    with compiler:
+        assert compiler.build_core_guide_text() == GOLDEN_CORE_GUIDE
+        assert compiler.build_type_definitions_text() == GOLDEN_TYPE_DEFINITIONS
+        assert compiler.build_mapping_text() == GOLDEN_MAPPING